@@ -0,0 +1,173 @@
+import csv
+import itertools
+import json
+import sys
+import time
+
+import degrees
+from cache import MISSING
+
+# Number of queries read, grouped by source and answered together
+CHUNK = 1000
+
+
+def main():
+    args = sys.argv[1:]
+    flags = {arg for arg in args if arg.startswith("--")}
+    args = [arg for arg in args if arg not in flags]
+    if not 1 <= len(args) <= 2 or flags - {"--compact", "--snapshot", "--fuzzy"}:
+        sys.exit("Usage: python batch.py [--compact] [--snapshot] [--fuzzy] directory [pairs.csv]")
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args[0], "--compact" in flags, "--snapshot" in flags)
+    print("Data loaded.", file=sys.stderr)
+
+    fuzzy = "--fuzzy" in flags
+    if len(args) == 2:
+        with open(args[1], encoding="utf-8", newline="") as f:
+            stats = run(csv.reader(f), sys.stdout, fuzzy)
+    else:
+        stats = run(csv.reader(sys.stdin), sys.stdout, fuzzy)
+    report(stats, sys.stderr)
+
+
+def resolve(name, birth=None, fuzzy=False):
+    """
+    Returns (person_id, error) for `name` without prompting, narrowing
+    by `birth` year if given. Only if `fuzzy` is true does a name with no
+    exact match fall back to the closest spelling. Exactly one of the
+    two is None.
+    """
+    if not fuzzy and name.lower() not in degrees.names:
+        return None, f"person not found: {name}"
+    person_ids = degrees.find_people(name, birth or None)
+    if not person_ids:
+        return None, f"person not found: {name}"
+    if len(person_ids) > 1:
+        return None, f"ambiguous name: {name} ({', '.join(person_ids)})"
+    return person_ids[0], None
+
+
+def answer(queries, fuzzy=False):
+    """
+    Answers a list of (source name, target name, source birth, target
+    birth) queries, where either birth year may be empty. Pairs answered
+    before come from `degrees.path_cache`; the rest reuse one
+    breadth-first tree for every query that shares a source.
+
+    If `fuzzy` is true, misspelled names resolve to the closest spelling,
+    and the name actually matched is recorded as "source_match" or
+    "target_match".
+
+    Returns one result dictionary per query, in query order.
+    """
+    cache = degrees.path_cache
+    cache.validate(degrees.graph_version)
+    results = []
+    by_source = {}
+    for source_name, target_name, source_birth, target_birth in queries:
+        start = time.perf_counter()
+        result = {"source": source_name, "target": target_name}
+        source, error = resolve(source_name, source_birth, fuzzy)
+        if error is None:
+            target, error = resolve(target_name, target_birth, fuzzy)
+        if error is None:
+            matched(result, "source", source_name, source)
+            matched(result, "target", target_name, target)
+        if error is not None:
+            result["error"] = error
+        else:
+            path = cache.get(source, target)
+            if path is MISSING:
+                by_source.setdefault(source, []).append((target, result))
+            else:
+                describe(result, path)
+        result["ms"] = (time.perf_counter() - start) * 1000
+        results.append(result)
+
+    for source, group in by_source.items():
+        tree = degrees.breadth_first_tree(source)
+        for target, result in group:
+
+            # Time spent growing the tree is charged to the query that needed it
+            start = time.perf_counter()
+            path = tree.path_to(target)
+            cache.put(source, target, path)
+            result["ms"] += (time.perf_counter() - start) * 1000
+            describe(result, path)
+    return results
+
+
+def matched(result, field, name, person_id):
+    """
+    Adds the name of `person_id` to `result` under `field` + "_match"
+    if it is not the `name` that was asked for.
+    """
+    match = degrees.people[person_id]["name"]
+    if match.lower() != name.lower():
+        result[f"{field}_match"] = match
+
+
+def describe(result, path):
+    """
+    Adds the degrees of separation and the (movie_id, person_id)
+    steps of `path`, or None for both if there is none, to `result`.
+    """
+    result["degrees"] = None if path is None else len(path)
+    result["path"] = None if path is None else [
+        {"movie_id": movie_id, "person_id": person_id}
+        for movie_id, person_id in path
+    ]
+
+
+def run(rows, out, fuzzy=False):
+    """
+    Answers every (source name, target name) row of `rows`, each
+    optionally followed by the two people's birth years, writing one
+    JSON line per query to `out`, with misspelled names resolved only
+    if `fuzzy` is true. Returns the per-query latencies in milliseconds
+    and the total wall time in seconds.
+    """
+    latencies = []
+    start = time.perf_counter()
+    rows = (row + [""] * (4 - len(row)) for row in rows if len(row) >= 2)
+    while True:
+        queries = [tuple(row[:4]) for row in itertools.islice(rows, CHUNK)]
+        if not queries:
+            break
+        for result in answer(queries, fuzzy):
+            latencies.append(result["ms"])
+            out.write(json.dumps(result) + "\n")
+        out.flush()
+    return latencies, time.perf_counter() - start
+
+
+def report(stats, out):
+    """
+    Writes query count, throughput, latency percentiles
+    and path cache counters to `out`.
+    """
+    latencies, seconds = stats
+    if not latencies:
+        print("No queries.", file=out)
+        return
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    print(f"{len(ordered)} queries in {seconds:.2f} s "
+          f"({len(ordered) / seconds:.1f} queries/s)", file=out)
+    print(f"Latency ms: mean {sum(ordered) / len(ordered):.2f}, "
+          f"p50 {percentile(50):.2f}, p99 {percentile(99):.2f}, "
+          f"max {ordered[-1]:.2f}", file=out)
+
+    cache = degrees.path_cache.stats()
+    lookups = cache["hits"] + cache["misses"]
+    print(f"Path cache: {cache['hits']} hits, {cache['misses']} misses "
+          f"({cache['hits'] / max(lookups, 1):.0%} hit rate), "
+          f"{cache['evictions']} evictions, {cache['paths']} paths kept", file=out)
+
+
+if __name__ == "__main__":
+    main()
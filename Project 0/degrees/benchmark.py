@@ -0,0 +1,224 @@
+import csv
+import gc
+import random
+import sys
+import time
+import tracemalloc
+
+import degrees
+
+# Fixed name pairs present in both the "small" and "large" directories
+PAIRS = [
+    ("Kevin Bacon", "Tom Hanks"),
+    ("Tom Cruise", "Sally Field"),
+    ("Emma Watson", "Jack Nicholson"),
+    ("Cary Elwes", "Dustin Hoffman"),
+    ("Chris Sarandon", "Bill Paxton"),
+    ("Demi Moore", "Gary Sinise"),
+    ("Mandy Patinkin", "Valeria Golino"),
+    ("Gerald R. Molen", "Robin Wright"),
+]
+
+# Number of timed runs per query; the fastest one is reported
+REPEAT = 3
+
+# Number of names looked up by the name index benchmark
+NAME_SAMPLES = 1000
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python benchmark.py [directory] [pairs.csv]")
+    directory = sys.argv[1] if len(sys.argv) >= 2 else "large"
+    pairs = load_pairs(sys.argv[2]) if len(sys.argv) == 3 else PAIRS
+
+    print("Loading data...")
+    degrees.load_data(directory)
+    print("Data loaded.")
+
+    benchmark_search(pairs)
+    benchmark_names()
+    benchmark_compact(directory, pairs)
+
+
+def load_pairs(filename):
+    """
+    Load (name, name) pairs from a two-column CSV file.
+    """
+    with open(filename, encoding="utf-8") as f:
+        return [tuple(row[:2]) for row in csv.reader(f) if len(row) >= 2]
+
+
+def resolve(name):
+    """
+    Returns a person_id for `name` without prompting,
+    picking the lowest id when the name is ambiguous.
+    """
+    person_ids = degrees.names.get(name.lower())
+    if not person_ids:
+        return None
+    return min(person_ids)
+
+
+def timed(function, *args):
+    """
+    Returns the result of `function(*args)` and the fastest
+    wall time in milliseconds over REPEAT runs.
+    """
+    best = None
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        result = function(*args)
+        elapsed = (time.perf_counter() - start) * 1000
+        if best is None or elapsed < best:
+            best = elapsed
+    return result, best
+
+
+def benchmark_search(pairs):
+    """
+    Compares one-sided and bidirectional breadth-first search
+    latency over `pairs`, checking that both agree on the degrees.
+    """
+    print(f"{'source':>20} {'target':>20} {'deg':>4} {'bfs ms':>10} {'bidi ms':>10}")
+    total_bfs = total_bidi = 0
+    for source_name, target_name in pairs:
+        source = resolve(source_name)
+        target = resolve(target_name)
+        if source is None or target is None:
+            print(f"{source_name:>20} {target_name:>20}  skipped, person not found")
+            continue
+
+        path, bfs_ms = timed(degrees.shortest_path, source, target)
+        bidi, bidi_ms = timed(degrees.bidirectional_shortest_path, source, target)
+        if (path is None) != (bidi is None) or (path and len(path) != len(bidi)):
+            sys.exit(f"Mismatch between searches for {source_name} and {target_name}")
+
+        total_bfs += bfs_ms
+        total_bidi += bidi_ms
+        deg = "-" if path is None else len(path)
+        print(f"{source_name:>20} {target_name:>20} {deg:>4} {bfs_ms:>10.2f} {bidi_ms:>10.2f}")
+
+    if total_bidi:
+        print(f"Total: {total_bfs:.2f} ms vs {total_bidi:.2f} ms "
+              f"({total_bfs / total_bidi:.1f}x speed-up)")
+
+
+def unload():
+    """
+    Forget everything loaded by `degrees.load_data`.
+    """
+    degrees.names.clear()
+    degrees.people.clear()
+    degrees.movies.clear()
+    degrees.graph = None
+    gc.collect()
+
+
+def measured_load(directory, compact):
+    """
+    Loads `directory` and returns the bytes left allocated by the load.
+    """
+    unload()
+    tracemalloc.start()
+    degrees.load_data(directory, compact)
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def sweep():
+    """
+    Returns milliseconds taken to list the neighbors of every person once.
+    """
+    start = time.perf_counter()
+    for person_id in degrees.people:
+        degrees.neighbors_for_person(person_id)
+    return (time.perf_counter() - start) * 1000
+
+
+def search_all(pairs):
+    """
+    Returns milliseconds taken to answer every resolvable pair
+    with bidirectional search.
+    """
+    queries = [(resolve(s), resolve(t)) for s, t in pairs]
+    queries = [(s, t) for s, t in queries if s is not None and t is not None]
+    start = time.perf_counter()
+    for source, target in queries:
+        degrees.bidirectional_shortest_path(source, target)
+    return (time.perf_counter() - start) * 1000
+
+
+def benchmark_compact(directory, pairs):
+    """
+    Compares memory per star credit and traversal speed of the
+    dictionary and compact graph representations.
+    """
+    dict_bytes = measured_load(directory, compact=False)
+    edges = sum(len(person["movies"]) for person in degrees.people.values())
+    dict_sweep = sweep()
+    dict_search = search_all(pairs)
+
+    compact_bytes = measured_load(directory, compact=True)
+    compact_sweep = sweep()
+    compact_search = search_all(pairs)
+    adjacency = degrees.graph.nbytes()
+
+    print(f"{edges} star credits")
+    print(f"{'mode':>8} {'MB':>10} {'B/edge':>10} {'sweep ms':>10} {'search ms':>10}")
+    for mode, size, sweep_ms, search_ms in [
+        ("dict", dict_bytes, dict_sweep, dict_search),
+        ("compact", compact_bytes, compact_sweep, compact_search),
+    ]:
+        print(f"{mode:>8} {size / 2 ** 20:>10.1f} {size / max(edges, 1):>10.1f} "
+              f"{sweep_ms:>10.2f} {search_ms:>10.2f}")
+    print(f"Compact adjacency arrays: {adjacency / max(edges, 1):.1f} B/edge")
+
+
+def misspell(name, rng):
+    """
+    Returns `name` with one character replaced by a random letter.
+    """
+    i = rng.randrange(len(name))
+    return name[:i] + rng.choice("abcdefghijklmnopqrstuvwxyz") + name[i + 1:]
+
+
+def benchmark_names():
+    """
+    Times building the name index, then exact, prefix and fuzzy lookups
+    of sampled names, reporting how often a misspelled name still finds
+    the intended person.
+    """
+    rng = random.Random(0)
+    keys = sorted(degrees.names)
+    sample = rng.sample(keys, min(NAME_SAMPLES, len(keys)))
+    if not sample:
+        return
+
+    start = time.perf_counter()
+    index = degrees.get_name_index()
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Name index over {len(index)} names built in {build_ms:.0f} ms")
+
+    def mean_ms(lookup, queries):
+        start = time.perf_counter()
+        results = [lookup(query) for query in queries]
+        return results, (time.perf_counter() - start) * 1000 / len(queries)
+
+    _, exact_ms = mean_ms(degrees.find_people, sample)
+    _, prefix_ms = mean_ms(
+        lambda name: index.prefix(name[:4], limit=20), sample
+    )
+    typos = [misspell(name, rng) for name in sample]
+    found, fuzzy_ms = mean_ms(degrees.find_people, typos)
+    recall = sum(
+        bool(set(ids) & degrees.names[name]) for ids, name in zip(found, sample)
+    ) / len(sample)
+    print(f"Lookup ms: exact {exact_ms:.3f}, prefix {prefix_ms:.3f}, "
+          f"fuzzy {fuzzy_ms:.3f} ({recall:.0%} of misspellings resolved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+from collections import OrderedDict
+
+from search import reverse_path
+
+# Number of person pairs whose shortest path is remembered
+CAPACITY = 100000
+
+# Number of partially grown breadth-first trees kept for hot sources
+TREES = 8
+
+# Misses from one source before its breadth-first tree is kept
+HOT = 3
+
+# Returned by `PathCache.get` for pairs it does not hold
+MISSING = object()
+
+
+class PathCache():
+    """
+    Least-recently-used cache of shortest paths keyed by the unordered
+    pair of people, plus partially grown breadth-first trees for the
+    sources that miss most often. Everything is dropped whenever the
+    graph version it was filled from changes.
+    """
+
+    def __init__(self, capacity=CAPACITY, trees=TREES, hot=HOT):
+        self.capacity = capacity
+        self.tree_capacity = trees
+        self.hot = hot
+        self.version = None
+        self.paths = OrderedDict()
+        self.trees = OrderedDict()
+        self.misses_by_source = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.tree_hits = 0
+        self.tree_evictions = 0
+        self.invalidations = 0
+
+    def validate(self, version):
+        """
+        Drops every entry if the graph has changed since the
+        cache was filled, then records the current `version`.
+        """
+        if version != self.version:
+            if self.version is not None:
+                self.invalidations += 1
+            self.clear()
+            self.version = version
+
+    def clear(self):
+        """Drops every cached path and tree."""
+        self.paths.clear()
+        self.trees.clear()
+        self.misses_by_source.clear()
+
+    def get(self, source, target):
+        """
+        Returns the cached path from `source` to `target`,
+        which may be None if they are not connected,
+        or MISSING if the pair is not cached.
+        """
+        key = (source, target) if source <= target else (target, source)
+        path = self.paths.get(key, MISSING)
+        if path is MISSING:
+            self.misses += 1
+            return MISSING
+        self.hits += 1
+        self.paths.move_to_end(key)
+        if path is None or key[0] == source:
+            return path
+        return reverse_path(target, path)
+
+    def put(self, source, target, path):
+        """
+        Caches the path from `source` to `target`, evicting the
+        least recently used pair if the cache is full.
+        """
+        if source <= target:
+            key = (source, target)
+        else:
+            key = (target, source)
+            path = None if path is None else reverse_path(source, path)
+        self.paths[key] = path
+        self.paths.move_to_end(key)
+        while len(self.paths) > self.capacity:
+            self.paths.popitem(last=False)
+            self.evictions += 1
+
+    def tree(self, source, build):
+        """
+        Returns the kept breadth-first tree for `source`. If there is none
+        and `source` has missed HOT times, builds one with `build(source)`
+        and keeps it. Otherwise returns None.
+        """
+        tree = self.trees.get(source)
+        if tree is not None:
+            self.tree_hits += 1
+            self.trees.move_to_end(source)
+            return tree
+
+        misses = self.misses_by_source.pop(source, 0) + 1
+        if misses < self.hot:
+            self.misses_by_source[source] = misses
+            while len(self.misses_by_source) > self.capacity:
+                self.misses_by_source.popitem(last=False)
+            return None
+
+        tree = self.trees[source] = build(source)
+        while len(self.trees) > self.tree_capacity:
+            self.trees.popitem(last=False)
+            self.tree_evictions += 1
+        return tree
+
+    def shortest_path(self, source, target, search, build):
+        """
+        Returns `search(source, target)`, answering from the cached paths
+        or a kept breadth-first tree of `source` when possible.
+        """
+        path = self.get(source, target)
+        if path is not MISSING:
+            return path
+        tree = self.tree(source, build)
+        path = search(source, target) if tree is None else tree.path_to(target)
+        self.put(source, target, path)
+        return path
+
+    def stats(self):
+        """Returns the cache's counters and current sizes."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "tree_hits": self.tree_hits,
+            "tree_evictions": self.tree_evictions,
+            "invalidations": self.invalidations,
+            "paths": len(self.paths),
+            "trees": len(self.trees),
+        }
@@ -1,6 +1,12 @@
 import csv
 import sys
 
+import ingest
+import landmarks
+import snapshot
+from cache import PathCache
+from nameindex import MAX_DISTANCE, NameIndex
+from search import BreadthFirstTree, bidirectional_search
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
@@ -12,11 +18,62 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed star graph, used instead of the
+# "movies" and "stars" sets above when loaded with compact=True
+graph = None
 
-def load_data(directory):
+# Landmark distance index over `graph`, if one has been loaded
+landmark_index = None
+
+# Prefix and fuzzy index over `names`, built the first time it is needed
+name_index = None
+
+# Bumped whenever the loaded graph changes, invalidating `path_cache`
+graph_version = 0
+
+# Recently answered paths, and search trees of frequently asked-about people
+path_cache = PathCache()
+
+
+def load_data(directory, compact=False, use_snapshot=False, years=None):
     """
     Load data from CSV files into memory.
+
+    If `compact` is true, stream the star graph into a CompactGraph
+    rather than into per-person and per-movie sets.
+
+    If `use_snapshot` is true, memory-map a binary snapshot of the
+    compact graph instead when one matches the CSV files, and write
+    one after loading otherwise.
+
+    If `years` is an inclusive (first, last) range, load the compact
+    graph of movies released in those years and the people in them.
+
+    Returns a dictionary counting the stars rows that were not loaded,
+    by reason.
     """
+    global graph, names, people, movies, graph_version
+    graph_version += 1
+
+    if use_snapshot:
+        loaded = snapshot.load(directory, years)
+        if loaded is not None:
+            graph, people, names, movies = loaded
+            return {}
+
+    if compact or use_snapshot or years is not None:
+        graph, people, names, movies, dropped = ingest.load(directory, years)
+        if use_snapshot:
+            try:
+                snapshot.write(directory, graph, people, movies)
+            except OSError:
+                pass
+        return dropped
+
+    graph = None
+    names, people, movies = {}, {}, {}
+    dropped = {"unknown movie": 0, "unknown person": 0}
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -45,21 +102,54 @@ def load_data(directory):
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            try:
+            if row["person_id"] not in people:
+                dropped["unknown person"] += 1
+            elif row["movie_id"] not in movies:
+                dropped["unknown movie"] += 1
+            else:
                 people[row["person_id"]]["movies"].add(row["movie_id"])
                 movies[row["movie_id"]]["stars"].add(row["person_id"])
-            except KeyError:
-                pass
+
+    return dropped
+
+
+def load_landmarks(directory):
+    """
+    Load the landmark index built by landmarks.py for `directory`,
+    if one matches the loaded compact graph. Returns whether it did.
+    """
+    global landmark_index
+    landmark_index = None if graph is None else landmarks.load(directory, graph)
+    return landmark_index is not None
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    args = sys.argv[1:]
+    flags = {arg for arg in args if arg.startswith("--")}
+    args = [arg for arg in args if arg not in flags]
+    usage = ("Usage: python degrees.py [--compact] [--snapshot] "
+             "[--landmarks] [--years=FIRST-LAST] [directory]")
+    years = None
+    for flag in [flag for flag in flags if flag.startswith("--years=")]:
+        first, _, last = flag.split("=", 1)[1].partition("-")
+        try:
+            years = (int(first), int(last or first))
+        except ValueError:
+            sys.exit(usage)
+        flags.remove(flag)
+    if len(args) > 1 or flags - {"--compact", "--snapshot", "--landmarks"}:
+        sys.exit(usage)
+    directory = args[0] if len(args) == 1 else "large"
+    compact = "--compact" in flags or "--landmarks" in flags
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    dropped = load_data(directory, compact, "--snapshot" in flags, years)
+    if "--landmarks" in flags and not load_landmarks(directory):
+        print("No current landmark index; run landmarks.py to build one.")
+    if sum(dropped.values()):
+        reasons = ", ".join(f"{n} {reason}" for reason, n in dropped.items() if n)
+        print(f"Skipped {sum(dropped.values())} stars rows ({reasons}).")
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,7 +159,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = cached_shortest_path(source, target)
 
     if path is None:
         print("Not connected.")
@@ -122,15 +212,68 @@ def shortest_path(source, target):
     # TODO
     #raise NotImplementedError
 
+
+def bidirectional_shortest_path(source, target):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, expanding from both
+    people at once.
+
+    If no possible path, returns None.
+    """
+    if graph is not None:
+        return graph.shortest_path(source, target, landmark_index)
+    return bidirectional_search(source, target, neighbors_for_person)
+
+
+def cached_shortest_path(source, target):
+    """
+    Returns the same path as `bidirectional_shortest_path`, answered
+    from `path_cache` when the pair or its source was asked about
+    recently and the graph has not changed since.
+    """
+    path_cache.validate(graph_version)
+    return path_cache.shortest_path(
+        source, target, bidirectional_shortest_path, breadth_first_tree
+    )
+
+
+def separation_bounds(source, target):
+    """
+    Returns (lower, upper) bounds on the degrees of separation between
+    two people, read from the landmark index without searching.
+    Both are infinite if the people are known not to be connected.
+    """
+    if landmark_index is None:
+        return 0, landmarks.INFINITY
+    return landmark_index.bounds(
+        graph.person_index[source], graph.person_index[target]
+    )
+
+
+def breadth_first_tree(source):
+    """
+    Returns a breadth-first tree rooted at the person `source`, whose
+    `path_to(target)` gives the same paths as `shortest_path` and grows
+    the tree only as far as needed, so it can answer many targets.
+    """
+    if graph is not None:
+        return graph.breadth_first_tree(source)
+    return BreadthFirstTree(source, neighbors_for_person)
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
     """
     person_ids = list(names.get(name.lower(), set()))
+    exact = len(person_ids) > 0
+    if not exact:
+        person_ids = find_people(name)
     if len(person_ids) == 0:
         return None
-    elif len(person_ids) > 1:
+    elif len(person_ids) > 1 or not exact:
         print(f"Which '{name}'?")
         for person_id in person_ids:
             person = people[person_id]
@@ -148,11 +291,48 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def get_name_index():
+    """
+    Returns the NameIndex over `names`, building it on first use
+    and again whenever different data has been loaded.
+    """
+    global name_index
+    if name_index is None or name_index.names is not names:
+        name_index = NameIndex(names)
+    return name_index
+
+
+def find_people(name, birth=None, max_distance=MAX_DISTANCE):
+    """
+    Returns the sorted person_ids matching `name`, without prompting.
+
+    Exact case-insensitive matches win; failing those, the names fewest
+    edits away, up to `max_distance`. If `birth` is given, only people
+    born that year are considered.
+    """
+    candidates = [(0, name.lower())] if name.lower() in names else []
+    if not candidates:
+        candidates = get_name_index().fuzzy(name, max_distance)
+
+    person_ids = []
+    best = None
+    for distance, key in candidates:
+        if best is not None and distance > best:
+            break
+        for person_id in names[key]:
+            if birth is None or people[person_id]["birth"] == str(birth):
+                person_ids.append(person_id)
+                best = distance
+    return sorted(person_ids)
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return graph.neighbors_for_person(person_id)
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
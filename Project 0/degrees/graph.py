@@ -0,0 +1,428 @@
+import math
+from array import array
+from bisect import bisect_left
+
+from search import BreadthFirstTree, bidirectional_search
+
+# Distance recorded for people a breadth-first sweep never reaches
+UNREACHABLE = 255
+
+# Edits kept beside the arrays, as a fraction of the credits stored in
+# them, before they are merged in on their own
+MERGE_FRACTION = 0.05
+
+
+class CompactGraph():
+    """
+    Bipartite person-movie star graph with people and movies interned
+    to dense integers and adjacency kept in compressed sparse row form.
+
+    The movies of person `i` are `person_movies[person_offsets[i]:
+    person_offsets[i + 1]]`, and the stars of movie `j` likewise live in
+    `movie_stars` between `movie_offsets[j]` and `movie_offsets[j + 1]`.
+
+    Credits added or removed after loading are kept beside the arrays
+    until `merge` folds them in, which happens on its own once there are
+    more than MERGE_FRACTION of the credits in the arrays.
+    """
+
+    def __init__(self, person_ids, movie_ids,
+                 person_offsets, person_movies, movie_offsets, movie_stars,
+                 person_index=None, movie_index=None, years=None):
+        self.person_ids = person_ids
+        self.movie_ids = movie_ids
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+
+        # Maps IMDb ids back to their dense integer index
+        if person_index is None:
+            person_index = {
+                person_id: i for i, person_id in enumerate(person_ids)
+            }
+        if movie_index is None:
+            movie_index = {
+                movie_id: i for i, movie_id in enumerate(movie_ids)
+            }
+        self.person_index = person_index
+        self.movie_index = movie_index
+
+        # Inclusive (first, last) range of release years the graph
+        # was limited to when loaded, or None for every movie
+        self.years = years
+
+        # Credits added or removed since the arrays above were built.
+        # Until the first edit, adjacency is read from the arrays alone.
+        self.edited = False
+        self.added_movies = {}
+        self.added_stars = {}
+        self.removed = set()
+        self.edits = 0
+
+        # Interned people and movies whose ids were removed, kept so an
+        # id that comes back is interned where it was before
+        self.retired_people = {}
+        self.retired_movies = {}
+
+    @classmethod
+    def from_edges(cls, person_ids, movie_ids, edge_people, edge_movies):
+        """
+        Build a graph from parallel arrays of interned (person, movie)
+        star credits. Duplicate credits are stored once.
+        """
+        person_offsets, person_movies = csr(
+            len(person_ids), edge_people, edge_movies
+        )
+        movie_offsets, movie_stars = csr(
+            len(movie_ids), edge_movies, edge_people
+        )
+        return cls(person_ids, movie_ids,
+                   person_offsets, person_movies, movie_offsets, movie_stars)
+
+    def edge_count(self):
+        """Returns the number of distinct star credits in the graph."""
+        added = sum(len(movies) for movies in self.added_movies.values())
+        return len(self.person_movies) - len(self.removed) + added
+
+    def nbytes(self):
+        """Returns the bytes held by the adjacency arrays."""
+        return sum(
+            len(a) * a.itemsize for a in (
+                self.person_offsets, self.person_movies,
+                self.movie_offsets, self.movie_stars
+            )
+        )
+
+    def movies_for(self, person):
+        """Returns the interned movies a given interned person starred in."""
+        offsets = self.person_offsets
+        if not self.edited:
+            return self.person_movies[offsets[person]:offsets[person + 1]]
+        movies = []
+        if person < len(offsets) - 1:
+            movies = [
+                movie
+                for movie in self.person_movies[offsets[person]:offsets[person + 1]]
+                if (person, movie) not in self.removed
+            ]
+        return movies + sorted(self.added_movies.get(person, ()))
+
+    def stars_for(self, movie):
+        """Returns the interned people who starred in a given movie."""
+        offsets = self.movie_offsets
+        if not self.edited:
+            return self.movie_stars[offsets[movie]:offsets[movie + 1]]
+        stars = []
+        if movie < len(offsets) - 1:
+            stars = [
+                star
+                for star in self.movie_stars[offsets[movie]:offsets[movie + 1]]
+                if (star, movie) not in self.removed
+            ]
+        return stars + sorted(self.added_stars.get(movie, ()))
+
+    def neighbors(self, person):
+        """
+        Yields interned (movie, person) pairs for people
+        who starred with a given interned person.
+        """
+        if self.edited:
+            for movie in self.movies_for(person):
+                for star in self.stars_for(movie):
+                    yield movie, star
+            return
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        for movie in self.movies_for(person):
+            for star in movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                yield movie, star
+
+    def in_arrays(self, person, movie):
+        """
+        Returns whether the credit of an interned person in an interned
+        movie is stored in the arrays, whether or not it was removed since.
+        """
+        offsets = self.person_offsets
+        if person >= len(offsets) - 1:
+            return False
+        start, end = offsets[person], offsets[person + 1]
+        k = bisect_left(self.person_movies, movie, start, end)
+        return k < end and self.person_movies[k] == movie
+
+    def has_star(self, person, movie):
+        """Returns whether an interned person starred in an interned movie."""
+        if movie in self.added_movies.get(person, ()):
+            return True
+        return (person, movie) not in self.removed and self.in_arrays(person, movie)
+
+    def thaw(self):
+        """
+        Switches to lists and dictionaries for ids, so people and movies
+        can be added, and starts consulting the edits to the arrays.
+        """
+        if not isinstance(self.person_ids, list):
+            self.person_ids = list(self.person_ids)
+            self.person_index = {
+                person_id: i for i, person_id in enumerate(self.person_ids)
+            }
+        if not isinstance(self.movie_ids, list):
+            self.movie_ids = list(self.movie_ids)
+            self.movie_index = {
+                movie_id: i for i, movie_id in enumerate(self.movie_ids)
+            }
+        self.edited = True
+
+    def add_person(self, person_id):
+        """Interns `person_id` if it is new. Returns its interned person."""
+        self.thaw()
+        if person_id in self.retired_people:
+            self.person_index[person_id] = self.retired_people.pop(person_id)
+        elif person_id not in self.person_index:
+            self.person_index[person_id] = len(self.person_ids)
+            self.person_ids.append(person_id)
+        return self.person_index[person_id]
+
+    def add_movie(self, movie_id):
+        """Interns `movie_id` if it is new. Returns its interned movie."""
+        self.thaw()
+        if movie_id in self.retired_movies:
+            self.movie_index[movie_id] = self.retired_movies.pop(movie_id)
+        elif movie_id not in self.movie_index:
+            self.movie_index[movie_id] = len(self.movie_ids)
+            self.movie_ids.append(movie_id)
+        return self.movie_index[movie_id]
+
+    def remove_person(self, person_id):
+        """
+        Forgets `person_id`, whose credits must already be removed. Its
+        interned person is kept for if the id is added again.
+        """
+        self.thaw()
+        self.retired_people[person_id] = self.person_index.pop(person_id)
+
+    def remove_movie(self, movie_id):
+        """
+        Forgets `movie_id`, whose credits must already be removed. Its
+        interned movie is kept for if the id is added again.
+        """
+        self.thaw()
+        self.retired_movies[movie_id] = self.movie_index.pop(movie_id)
+
+    def add_star(self, person, movie):
+        """
+        Records that an interned person starred in an interned movie.
+        Returns whether the credit is new.
+        """
+        if self.has_star(person, movie):
+            return False
+        self.thaw()
+        if (person, movie) in self.removed:
+            self.removed.discard((person, movie))
+        else:
+            self.added_movies.setdefault(person, set()).add(movie)
+            self.added_stars.setdefault(movie, set()).add(person)
+        self.edit()
+        return True
+
+    def remove_star(self, person, movie):
+        """
+        Removes the credit of an interned person in an interned movie.
+        Returns whether there was one.
+        """
+        if not self.has_star(person, movie):
+            return False
+        self.thaw()
+        if movie in self.added_movies.get(person, ()):
+            self.added_movies[person].discard(movie)
+            self.added_stars[movie].discard(person)
+        else:
+            self.removed.add((person, movie))
+        self.edit()
+        return True
+
+    def edit(self):
+        """
+        Counts an edit to the credits, merging every edit into the arrays
+        once there are more than MERGE_FRACTION of the credits in them.
+        """
+        self.edits += 1
+        if self.edits > MERGE_FRACTION * len(self.person_movies):
+            self.merge()
+
+    def merge(self):
+        """
+        Rebuilds the arrays to include every edit since they were built,
+        so adjacency is read from them alone again.
+        """
+        if not self.edited:
+            return
+        edge_people = array("i")
+        edge_movies = array("i")
+        for person in range(len(self.person_ids)):
+            movies = self.movies_for(person)
+            edge_people.extend([person] * len(movies))
+            edge_movies.extend(movies)
+        merged = CompactGraph.from_edges(
+            self.person_ids, self.movie_ids, edge_people, edge_movies
+        )
+        self.person_offsets = merged.person_offsets
+        self.person_movies = merged.person_movies
+        self.movie_offsets = merged.movie_offsets
+        self.movie_stars = merged.movie_stars
+        self.added_movies = {}
+        self.added_stars = {}
+        self.removed = set()
+        self.edits = 0
+        self.edited = False
+
+    def neighbors_for_person(self, person_id):
+        """
+        Returns (movie_id, person_id) pairs for people
+        who starred with a given person.
+        """
+        person_ids = self.person_ids
+        movie_ids = self.movie_ids
+        return {
+            (movie_ids[movie], person_ids[star])
+            for movie, star in self.neighbors(self.person_index[person_id])
+        }
+
+    def shortest_path(self, source, target, landmarks=None):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs
+        that connect the source to the target.
+
+        If a LandmarkIndex is given, pairs it proves disconnected are
+        answered at once, and pairs whose bounds meet are answered by
+        walking toward a landmark instead of searching.
+
+        If no possible path, returns None.
+        """
+        source = self.person_index[source]
+        target = self.person_index[target]
+        path = None
+        if landmarks is not None:
+            lower, _ = landmarks.bounds(source, target)
+            if math.isinf(lower):
+                return None
+            path = landmarks.path(self, source, target)
+        if path is None:
+            path = bidirectional_search(source, target, self.neighbors)
+        return self.external_path(path)
+
+    def external_path(self, path):
+        """
+        Maps a path of interned (movie, person) pairs back to
+        (movie_id, person_id) pairs. None is passed through.
+        """
+        if path is None:
+            return None
+        return [
+            (self.movie_ids[movie], self.person_ids[person])
+            for movie, person in path
+        ]
+
+    def distances(self, source):
+        """
+        Runs a breadth-first sweep from the interned person `source`.
+
+        Returns a bytearray of each person's degrees of separation from
+        `source` (UNREACHABLE if not connected), and a list with the
+        number of people found at each distance. Every movie is expanded
+        at most once, and memory is one byte per person and per movie.
+        """
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+
+        edited = self.edited
+        dist = bytearray([UNREACHABLE]) * len(self.person_ids)
+        seen = bytearray(len(self.movie_ids))
+        dist[source] = 0
+        frontier = array("i", [source])
+        layers = [1]
+        depth = 0
+        while frontier and depth < UNREACHABLE - 1:
+            depth += 1
+            layer = array("i")
+            for person in frontier:
+                if edited:
+                    movies = self.movies_for(person)
+                else:
+                    movies = person_movies[person_offsets[person]:person_offsets[person + 1]]
+                for movie in movies:
+                    if seen[movie]:
+                        continue
+                    seen[movie] = 1
+                    if edited:
+                        stars = self.stars_for(movie)
+                    else:
+                        stars = movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]
+                    for star in stars:
+                        if dist[star] == UNREACHABLE:
+                            dist[star] = depth
+                            layer.append(star)
+            if layer:
+                layers.append(len(layer))
+            frontier = layer
+        return dist, layers
+
+    def breadth_first_tree(self, source):
+        """
+        Returns a PersonTree rooted at the person `source`.
+        """
+        return PersonTree(self, source)
+
+
+class PersonTree():
+    """
+    BreadthFirstTree over a CompactGraph that is queried with
+    person_ids and answers with (movie_id, person_id) paths.
+    """
+
+    def __init__(self, graph, source):
+        self.graph = graph
+        self.tree = BreadthFirstTree(graph.person_index[source], graph.neighbors)
+
+    def path_to(self, target):
+        """
+        Returns the shortest list of (movie_id, person_id) pairs that
+        connect the root to `target`. If no possible path, returns None.
+        """
+        path = self.tree.path_to(self.graph.person_index[target])
+        return self.graph.external_path(path)
+
+
+def csr(rows, sources, targets):
+    """
+    Returns (offsets, columns) arrays in compressed sparse row form for
+    the edges `sources[k] -> targets[k]` over `rows` rows, with the
+    columns of each row sorted and free of duplicates.
+    """
+
+    # Count edges per row, then turn the counts into start offsets
+    counts = array("q", bytes(8 * (rows + 1)))
+    for source in sources:
+        counts[source + 1] += 1
+    for i in range(rows):
+        counts[i + 1] += counts[i]
+
+    # Scatter each edge into its row
+    columns = array("i", bytes(4 * len(sources)))
+    fill = array("q", counts)
+    for source, target in zip(sources, targets):
+        columns[fill[source]] = target
+        fill[source] += 1
+
+    # Sort and deduplicate each row in place, compacting as we go
+    offsets = array("q", bytes(8 * (rows + 1)))
+    end = 0
+    for i in range(rows):
+        row = sorted(set(columns[counts[i]:counts[i + 1]]))
+        columns[end:end + len(row)] = array("i", row)
+        end += len(row)
+        offsets[i + 1] = end
+    del columns[end:]
+    return offsets, columns
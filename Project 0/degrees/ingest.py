@@ -0,0 +1,161 @@
+import csv
+import itertools
+from array import array
+
+from graph import CompactGraph, csr
+
+# Number of CSV rows parsed and interned per step
+CHUNK = 65536
+
+
+def chunks(reader, size=CHUNK):
+    """
+    Yields lists of at most `size` rows from `reader`.
+    """
+    while True:
+        rows = list(itertools.islice(reader, size))
+        if not rows:
+            return
+        yield rows
+
+
+def rows(directory, filename, fields):
+    """
+    Yields chunks of rows of `filename` in `directory`, each row
+    reduced to a tuple of the named `fields`.
+    """
+    with open(f"{directory}/{filename}", encoding="utf-8", newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        columns = [header.index(field) for field in fields]
+        for chunk in chunks(reader):
+            yield [tuple(row[c] for c in columns) for row in chunk]
+
+
+def in_years(year, years):
+    """
+    Returns whether the string `year` falls within the inclusive
+    (first, last) range `years`. Every year does when `years` is None.
+    """
+    if years is None:
+        return True
+    try:
+        return years[0] <= int(year) <= years[1]
+    except ValueError:
+        return False
+
+
+def load(directory, years=None):
+    """
+    Stream the CSV files in `directory` into a CompactGraph, interning ids
+    as they are read, without keeping row dictionaries or per-person sets.
+
+    If `years` is an inclusive (first, last) range, only movies released
+    in it are kept, along with the people who starred in them.
+
+    Returns (graph, people, names, movies, dropped) where people, names
+    and movies are shaped like the globals in degrees.py without the
+    "movies" and "stars" sets, and dropped counts the stars rows that
+    were not loaded by reason. Credits in movies outside `years` are
+    counted as "unknown movie".
+    """
+    dropped = {"unknown movie": 0, "unknown person": 0, "duplicate": 0}
+
+    # Movies first, so the year filter decides which credits to keep
+    movies = {}
+    movie_ids = []
+    movie_index = {}
+    for chunk in rows(directory, "movies.csv", ["id", "title", "year"]):
+        for movie_id, title, year in chunk:
+            if in_years(year, years) and movie_id not in movie_index:
+                movie_index[movie_id] = len(movie_ids)
+                movie_ids.append(movie_id)
+                movies[movie_id] = {"title": title, "year": year}
+
+    # Then star credits, interning people the first time they appear
+    person_ids = []
+    person_index = {}
+    edge_people = array("i")
+    edge_movies = array("i")
+    for chunk in rows(directory, "stars.csv", ["person_id", "movie_id"]):
+        chunk_people = []
+        chunk_movies = []
+        for person_id, movie_id in chunk:
+            movie = movie_index.get(movie_id)
+            if movie is None:
+                dropped["unknown movie"] += 1
+                continue
+            person = person_index.get(person_id)
+            if person is None:
+                person = person_index[person_id] = len(person_ids)
+                person_ids.append(person_id)
+            chunk_people.append(person)
+            chunk_movies.append(movie)
+        edge_people.extend(chunk_people)
+        edge_movies.extend(chunk_movies)
+
+    # Then people, keeping only those in the graph when filtering by year
+    people = {}
+    names = {}
+    found = bytearray(len(person_ids))
+    for chunk in rows(directory, "people.csv", ["id", "name", "birth"]):
+        for person_id, name, birth in chunk:
+            person = person_index.get(person_id)
+            if person is None:
+                if years is not None:
+                    continue
+                person = person_index[person_id] = len(person_ids)
+                person_ids.append(person_id)
+            elif person < len(found):
+                found[person] = 1
+            people[person_id] = {"name": name, "birth": birth}
+            names.setdefault(name.lower(), set()).add(person_id)
+
+    # Drop credits of people missing from people.csv, renumbering the rest
+    if found.count(0):
+        remap = array("i", bytes(4 * len(person_ids)))
+        kept = []
+        for person, person_id in enumerate(person_ids):
+            if person >= len(found) or found[person]:
+                remap[person] = len(kept)
+                kept.append(person_id)
+            else:
+                remap[person] = -1
+                del person_index[person_id]
+        end = 0
+        for person, movie in zip(edge_people, edge_movies):
+            if remap[person] >= 0:
+                edge_people[end] = remap[person]
+                edge_movies[end] = movie
+                end += 1
+        dropped["unknown person"] = len(edge_people) - end
+        del edge_people[end:]
+        del edge_movies[end:]
+        person_ids = kept
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+
+    person_offsets, person_movies = csr(len(person_ids), edge_people, edge_movies)
+    dropped["duplicate"] = len(edge_people) - len(person_movies)
+    del edge_people, edge_movies
+    movie_offsets, movie_stars = csr(
+        len(movie_ids), *stars_by_movie(person_offsets, person_movies)
+    )
+    graph = CompactGraph(
+        person_ids, movie_ids,
+        person_offsets, person_movies, movie_offsets, movie_stars,
+        person_index=person_index, movie_index=movie_index, years=years
+    )
+    return graph, people, names, movies, dropped
+
+
+def stars_by_movie(person_offsets, person_movies):
+    """
+    Returns (movies, people) edge arrays read back out of a person-major
+    CSR adjacency, for building the movie-major one.
+    """
+    edge_movies = array("i", person_movies)
+    edge_people = array("i", bytes(4 * len(person_movies)))
+    for person in range(len(person_offsets) - 1):
+        for k in range(person_offsets[person], person_offsets[person + 1]):
+            edge_people[k] = person
+    return edge_movies, edge_people
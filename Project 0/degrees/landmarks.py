@@ -0,0 +1,325 @@
+import collections
+import heapq
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+import time
+
+import snapshot
+from graph import UNREACHABLE
+from search import reverse_path
+
+# Landmark index written next to the CSV files it was built from
+LANDMARKS = "degrees.landmarks"
+
+# Bump whenever the layout below changes, so stale indexes are rebuilt
+MAGIC = b"DEGLMRK\0"
+VERSION = 2
+
+# Layout: MAGIC, a little-endian u32 version and u64 header length, a JSON
+# header, then one row of per-person distances for each landmark
+PREAMBLE = struct.Struct("<8sIQ")
+
+# Number of hub actors to measure distances from
+COUNT = 16
+
+INFINITY = float("inf")
+
+
+def main():
+    args = sys.argv[1:]
+    count = COUNT
+    usage = "Usage: python landmarks.py [--count=N] directory"
+    for arg in [arg for arg in args if arg.startswith("--count=")]:
+        try:
+            count = int(arg.split("=", 1)[1])
+        except ValueError:
+            sys.exit(usage)
+        args.remove(arg)
+    if len(args) != 1:
+        sys.exit(usage)
+    directory = args[0]
+
+    loaded = snapshot.load(directory)
+    if loaded is None:
+        sys.exit("No current snapshot; run degrees.py --snapshot first.")
+    graph = loaded[0]
+
+    start = time.perf_counter()
+    index = build(graph, count)
+    path = write(directory, index, graph.years)
+    seconds = time.perf_counter() - start
+
+    people = loaded[1]
+    for landmark in index.landmarks:
+        person_id = graph.person_ids[landmark]
+        print(f"Landmark: {people[person_id]['name']} ({person_id})")
+    print(f"Built {len(index.landmarks)} landmarks in {seconds:.2f} s, "
+          f"{os.path.getsize(path) / 2 ** 20:.1f} MB on disk")
+
+
+class LandmarkIndex():
+    """
+    Degrees of separation from a few landmark people to everyone else,
+    giving constant-time bounds on the distance between any two people.
+    """
+
+    def __init__(self, landmarks, rows):
+        self.landmarks = landmarks
+        self.rows = rows
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        two interned people. Both are INFINITY if a landmark proves they
+        are not connected; upper is INFINITY when no landmark reaches both.
+        """
+        lower = 0
+        upper = INFINITY
+        for row in self.rows:
+            s, t = row[source], row[target]
+            if s == UNREACHABLE and t == UNREACHABLE:
+                continue
+            if s == UNREACHABLE or t == UNREACHABLE:
+                return INFINITY, INFINITY
+            lower = max(lower, abs(s - t))
+            upper = min(upper, s + t)
+        return lower, upper
+
+    def path(self, graph, source, target):
+        """
+        Returns a shortest list of interned (movie, person) pairs between
+        two people whose bounds meet, or None if they do not.
+
+        When lower and upper bounds agree, some landmark lies on a shortest
+        path, so the path is found by walking down that landmark's
+        distances from both people instead of searching.
+        """
+        lower, upper = self.bounds(source, target)
+        if math.isinf(upper) or lower != upper:
+            return None
+        for row in self.rows:
+            if row[source] + row[target] == upper:
+                down = descend(graph, row, source)
+                up = descend(graph, row, target)
+                if down is None or up is None:
+                    return None
+                return down + reverse_path(target, up)
+        return None
+
+    def grow(self, people):
+        """
+        Makes the rows writable, extending them to `people` entries
+        with new people not yet reachable from any landmark.
+        """
+        for i, row in enumerate(self.rows):
+            if not isinstance(row, bytearray):
+                row = self.rows[i] = bytearray(row)
+            if len(row) < people:
+                row.extend(bytes([UNREACHABLE]) * (people - len(row)))
+
+    def connect(self, graph, movie):
+        """
+        Updates the distances after credits were added to the interned
+        `movie`, by lowering them outward from its stars where the movie
+        now gives a shorter way to a landmark.
+        """
+        self.grow(len(graph.person_ids))
+        stars = graph.stars_for(movie)
+        for row in self.rows:
+            closest = min((row[star] for star in stars), default=UNREACHABLE)
+            if closest >= UNREACHABLE - 1:
+                continue
+            frontier = collections.deque()
+            for star in stars:
+                if row[star] > closest + 1:
+                    row[star] = closest + 1
+                    frontier.append(star)
+            while frontier:
+                person = frontier.popleft()
+                for _, star in graph.neighbors(person):
+                    if row[star] > row[person] + 1:
+                        row[star] = row[person] + 1
+                        frontier.append(star)
+
+    def disconnect(self, graph, person, movie):
+        """
+        Updates the distances after the credit of the interned `person` in
+        the interned `movie` was removed.
+
+        Distances only change if one of the two sides of a removed co-star
+        edge has lost its last neighbor one degree closer to a landmark, so
+        only the people beyond such an edge are looked at again.
+        """
+        self.grow(len(graph.person_ids))
+        stars = graph.stars_for(movie)
+        for row in self.rows:
+            ends = [
+                star for star in stars
+                if row[star] == row[person] + 1 < UNREACHABLE
+            ]
+            if row[person] != 0 and any(
+                    row[star] == row[person] - 1 for star in stars):
+                ends.append(person)
+            if ends:
+                repair(graph, row, ends)
+
+
+def repair(graph, row, ends):
+    """
+    Fixes the distances in `row` after co-star edges at the people `ends`
+    were removed, revisiting only the people whose every shortest way to
+    the landmark went through a removed edge.
+    """
+
+    # Nearest first, find who has no co-star one degree closer left
+    lost = set()
+    queue = [(row[end], end) for end in ends]
+    heapq.heapify(queue)
+    while queue:
+        _, person = heapq.heappop(queue)
+        if person in lost:
+            continue
+        if any(row[star] == row[person] - 1 and star not in lost
+               for _, star in graph.neighbors(person)):
+            continue
+        lost.add(person)
+        for _, star in graph.neighbors(person):
+            if row[star] == row[person] + 1:
+                heapq.heappush(queue, (row[star], star))
+    if not lost:
+        return
+
+    # Then settle them again outward from their nearest unaffected co-stars
+    for person in lost:
+        row[person] = UNREACHABLE
+    queue = []
+    for person in lost:
+        closest = min(
+            (row[star] for _, star in graph.neighbors(person) if star not in lost),
+            default=UNREACHABLE
+        )
+        if closest < UNREACHABLE - 1:
+            queue.append((closest + 1, person))
+    heapq.heapify(queue)
+    while queue:
+        distance, person = heapq.heappop(queue)
+        if distance >= row[person]:
+            continue
+        row[person] = distance
+        if distance + 1 >= UNREACHABLE:
+            continue
+        for _, star in graph.neighbors(person):
+            if star in lost and distance + 1 < row[star]:
+                heapq.heappush(queue, (distance + 1, star))
+
+
+def descend(graph, row, person):
+    """
+    Returns the interned (movie, person) path from `person` to the
+    landmark of `row`, always stepping to a co-star one degree closer,
+    or None if some step has no such co-star, as when `row` is stale.
+    """
+    path = []
+    while row[person] != 0:
+        for movie, star in graph.neighbors(person):
+            if row[star] == row[person] - 1:
+                path.append((movie, star))
+                person = star
+                break
+        else:
+            return None
+    return path
+
+
+def build(graph, count=COUNT):
+    """
+    Returns a LandmarkIndex over `count` landmarks, picked greedily as the
+    people with the most movies who are not co-stars of a landmark already.
+    """
+    offsets = graph.person_offsets
+    by_movies = sorted(
+        range(len(graph.person_ids)),
+        key=lambda person: offsets[person + 1] - offsets[person],
+        reverse=True
+    )
+    landmarks = []
+    rows = []
+    for person in by_movies:
+        if len(landmarks) == count:
+            break
+        if any(row[person] <= 1 for row in rows):
+            continue
+        dist, _ = graph.distances(person)
+        landmarks.append(person)
+        rows.append(dist)
+    return LandmarkIndex(landmarks, rows)
+
+
+def write(directory, index, years=None):
+    """
+    Write a landmark index into `directory` for a graph limited to the
+    `years` range, if any. Returns the index's path.
+    """
+    people = len(index.rows[0]) if index.rows else 0
+    header = json.dumps({
+        "sources": snapshot.signature(directory),
+        "layout": snapshot.VERSION,
+        "years": None if years is None else list(years),
+        "people": people,
+        "landmarks": list(index.landmarks),
+    }).encode("utf-8")
+    start = snapshot.align(PREAMBLE.size + len(header))
+
+    path = os.path.join(directory, LANDMARKS)
+    partial = path + ".partial"
+    with open(partial, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        f.seek(start)
+        for row in index.rows:
+            f.write(row)
+    os.replace(partial, path)
+    return path
+
+
+def load(directory, graph):
+    """
+    Memory-map the landmark index in `directory` for `graph`.
+
+    Returns a LandmarkIndex, or None if there is no index or it is
+    out of date with respect to the CSV files or the graph.
+    """
+    path = os.path.join(directory, LANDMARKS)
+    try:
+        with open(path, "rb") as f:
+            magic, version, length = PREAMBLE.unpack(f.read(PREAMBLE.size))
+            if magic != MAGIC or version != VERSION:
+                return None
+            header = json.loads(f.read(length))
+            if (header["sources"] != snapshot.signature(directory)
+                    or header["layout"] != snapshot.VERSION
+                    or header["years"] != (
+                        None if graph.years is None else list(graph.years))
+                    or header["people"] != len(graph.person_ids)
+                    or not header["landmarks"]):
+                return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, struct.error):
+        return None
+
+    start = snapshot.align(PREAMBLE.size + length)
+    people = header["people"]
+    view = memoryview(mapped)
+    rows = [
+        view[start + i * people:start + (i + 1) * people]
+        for i in range(len(header["landmarks"]))
+    ]
+    return LandmarkIndex(header["landmarks"], rows)
+
+
+if __name__ == "__main__":
+    main()
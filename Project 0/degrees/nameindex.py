@@ -0,0 +1,161 @@
+import itertools
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+# Largest number of edits a fuzzy match may be away from the query
+MAX_DISTANCE = 2
+
+# Trigrams counted beyond the minimum needed to find every match,
+# trading a little counting for far fewer edit distance checks
+EXTRA_GRAMS = 3
+
+
+class NameIndex():
+    """
+    Prefix and fuzzy lookup over the lowercased names of a `names`
+    mapping shaped like the one in degrees.py.
+
+    Names are kept in a sorted list for prefix search. Each name is also
+    posted under its character trigrams, so fuzzy search only compares
+    the query against names sharing its rarest trigrams.
+    """
+
+    def __init__(self, names):
+        self.names = names
+        self.keys = sorted(names)
+
+        # Names in the order they were posted, None where one was removed
+        self.entries = list(self.keys)
+
+        # Maps each trigram to the positions in `entries` of names containing it
+        self.grams = {}
+        for i, key in enumerate(self.entries):
+            self.post(i, key)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def post(self, i, key):
+        """Adds entry `i` to the postings of each trigram of `key`."""
+        for gram in trigrams(key):
+            postings = self.grams.get(gram)
+            if postings is None:
+                postings = self.grams[gram] = array("i")
+            if not postings or postings[-1] != i:
+                postings.append(i)
+
+    def add(self, key):
+        """Adds the lowercased name `key`, if it is not indexed already."""
+        k = bisect_left(self.keys, key)
+        if k < len(self.keys) and self.keys[k] == key:
+            return
+        self.keys.insert(k, key)
+        self.entries.append(key)
+        self.post(len(self.entries) - 1, key)
+
+    def remove(self, key):
+        """
+        Removes the lowercased name `key`, if it is indexed. Its postings
+        are left in place and skipped by fuzzy search from then on.
+        """
+        k = bisect_left(self.keys, key)
+        if k == len(self.keys) or self.keys[k] != key:
+            return
+        del self.keys[k]
+        rarest = min((self.grams[gram] for gram in trigrams(key)), key=len)
+        for i in rarest:
+            if self.entries[i] == key:
+                self.entries[i] = None
+
+    def prefix(self, prefix, limit=None):
+        """
+        Returns the names starting with `prefix`, in sorted order,
+        at most `limit` of them if given.
+        """
+        prefix = prefix.lower()
+        matches = []
+        i = bisect_left(self.keys, prefix)
+        while i < len(self.keys) and self.keys[i].startswith(prefix):
+            if limit is not None and len(matches) == limit:
+                break
+            matches.append(self.keys[i])
+            i += 1
+        return matches
+
+    def fuzzy(self, name, max_distance=MAX_DISTANCE):
+        """
+        Returns (distance, name) pairs for every name within
+        `max_distance` edits of `name`, closest first.
+        """
+        name = name.lower()
+        grams = set(trigrams(name))
+
+        # A name within k edits shares all but at most 3k of the query's
+        # trigrams. Trigrams no name has use up part of that allowance, and
+        # of any |S| known trigrams a match must share |S| minus the rest.
+        known = sorted(
+            (gram for gram in grams if gram in self.grams),
+            key=lambda gram: len(self.grams[gram])
+        )
+        allowance = 3 * max_distance - (len(grams) - len(known))
+        if allowance < 0:
+            return []
+        rarest = known[:allowance + 1 + EXTRA_GRAMS]
+        threshold = len(rarest) - allowance
+        if threshold <= 0:
+            candidates = range(len(self.entries))
+        else:
+            counts = Counter(itertools.chain.from_iterable(
+                self.grams[gram] for gram in rarest
+            ))
+            candidates = [i for i, n in counts.items() if n >= threshold]
+
+        matches = []
+        for i in candidates:
+            key = self.entries[i]
+            if key is None or abs(len(key) - len(name)) > max_distance:
+                continue
+            distance = edit_distance(name, key, max_distance)
+            if distance <= max_distance:
+                matches.append((distance, key))
+        matches.sort()
+        return matches
+
+
+def trigrams(name):
+    """
+    Yields the character trigrams of `name`, padded so that
+    its first and last characters start and end a trigram.
+    """
+    padded = f"^{name}$"
+    for i in range(len(padded) - 2):
+        yield padded[i:i + 3]
+
+
+def edit_distance(a, b, limit):
+    """
+    Returns the Levenshtein distance between `a` and `b`,
+    or `limit + 1` once it is known to exceed `limit`.
+
+    Only cells within `limit` of the diagonal are computed,
+    since any alignment leaving that band costs more.
+    """
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    over = limit + 1
+    previous = [j if j <= limit else over for j in range(len(b) + 1)]
+    for i in range(1, len(a) + 1):
+        current = [i if i <= limit else over] + [over] * len(b)
+        ca = a[i - 1]
+        for j in range(max(1, i - limit), min(len(b), i + limit) + 1):
+            cost = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost if cost < over else over
+        if min(current) > limit:
+            return over
+        previous = current
+    return previous[-1]
@@ -0,0 +1,123 @@
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+import snapshot
+
+# Snapshot graph memory-mapped into each worker by `init_worker`
+graph = None
+
+
+def main():
+    args = sys.argv[1:]
+    usage = ("Usage: python parallel.py [--processes=N] directory "
+             "average [samples] [seed] | eccentricity names.txt")
+    processes = os.cpu_count()
+    for arg in [arg for arg in args if arg.startswith("--processes=")]:
+        try:
+            processes = int(arg.split("=", 1)[1])
+        except ValueError:
+            sys.exit(usage)
+        args.remove(arg)
+    if len(args) < 2 or args[1] not in ["average", "eccentricity"] or (
+        args[1] == "eccentricity" and len(args) != 3
+    ):
+        sys.exit(usage)
+    directory, job = args[0], args[1]
+
+    loaded = prepare(directory)
+    if loaded is None:
+        sys.exit("Could not write a snapshot for directory.")
+    main_graph, _, names, _ = loaded
+
+    if job == "average":
+        try:
+            samples = int(args[2]) if len(args) > 2 else 1000
+            seed = int(args[3]) if len(args) > 3 else 0
+        except ValueError:
+            sys.exit(usage)
+        count = len(main_graph.person_ids)
+        sources = random.Random(seed).sample(range(count), min(samples, count))
+    else:
+        with open(args[2], encoding="utf-8") as f:
+            wanted = [line.strip() for line in f if line.strip()]
+        sources = []
+        for name in wanted:
+            person_ids = names.get(name.lower())
+            if not person_ids:
+                print(f"{name}: person not found", file=sys.stderr)
+                continue
+            sources.extend(main_graph.person_index[i] for i in sorted(person_ids))
+
+    start = time.perf_counter()
+    results = run_sweeps(directory, sources, processes)
+    seconds = time.perf_counter() - start
+
+    if job == "average":
+        reached = sum(r[2] - 1 for r in results)
+        total = sum(r[3] for r in results)
+        pairs = len(results) * (len(main_graph.person_ids) - 1)
+        if reached:
+            print(f"Average degrees of separation: {total / reached:.3f}")
+        print(f"Connected pairs: {reached} of {pairs} sampled")
+    else:
+        people = loaded[1]
+        for source, eccentricity, reached, _ in sorted(results):
+            person_id = main_graph.person_ids[source]
+            print(f"{people[person_id]['name']} ({person_id}): "
+                  f"eccentricity {eccentricity}, reaches {reached - 1} people")
+
+    print(f"{len(results)} sweeps on {processes} processes in {seconds:.2f} s "
+          f"({len(results) / seconds:.1f} sweeps/s)", file=sys.stderr)
+
+
+def prepare(directory):
+    """
+    Returns the loaded snapshot of `directory`, writing one
+    first if there is no current snapshot. None if that fails.
+    """
+    loaded = snapshot.load(directory)
+    if loaded is None:
+        import degrees
+        degrees.load_data(directory, use_snapshot=True)
+        loaded = snapshot.load(directory)
+    return loaded
+
+
+def init_worker(directory):
+    """
+    Memory-maps the snapshot of `directory` into this worker. Every
+    worker maps the same file, so the graph's pages are shared
+    read-only through the page cache rather than copied.
+    """
+    global graph
+    graph = snapshot.load(directory)[0]
+
+
+def sweep(source):
+    """
+    Runs a breadth-first sweep from the interned person `source`.
+    Returns (source, eccentricity, people reached including source,
+    sum of distances to everyone reached).
+    """
+    _, layers = graph.distances(source)
+    total = sum(depth * count for depth, count in enumerate(layers))
+    return source, len(layers) - 1, sum(layers), total
+
+
+def run_sweeps(directory, sources, processes):
+    """
+    Runs `sweep` for every interned source across a pool of
+    `processes` workers sharing the snapshot of `directory`.
+    """
+    if not sources:
+        return []
+    chunksize = max(1, len(sources) // (4 * processes))
+    with multiprocessing.Pool(processes, init_worker, (directory,)) as pool:
+        return list(pool.imap_unordered(sweep, sources, chunksize))
+
+
+if __name__ == "__main__":
+    main()
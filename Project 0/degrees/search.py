@@ -0,0 +1,155 @@
+def bidirectional_search(source, target, neighbors):
+    """
+    Returns the shortest list of (action, state) pairs that connect
+    `source` to `target`, searching breadth-first from both ends at once.
+
+    `neighbors` is a function mapping a state to an iterable of
+    (action, state) pairs. The graph is assumed to be undirected, so the
+    same function is used to expand both searches.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+
+    # Maps each discovered state to the (action, state) pair it was reached by
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+    forward_depth = 0
+    backward_depth = 0
+
+    # Depth of each state on its own side, used to score meeting points
+    forward_dist = {source: 0}
+    backward_dist = {target: 0}
+
+    best = None
+    meeting = None
+
+    while forward_frontier and backward_frontier:
+
+        # Always expand the smaller frontier one full layer
+        if len(forward_frontier) <= len(backward_frontier):
+            parents, dist, frontier = forward, forward_dist, forward_frontier
+            other_dist = backward_dist
+            forward_depth += 1
+            depth = forward_depth
+        else:
+            parents, dist, frontier = backward, backward_dist, backward_frontier
+            other_dist = forward_dist
+            backward_depth += 1
+            depth = backward_depth
+
+        layer = []
+        for state in frontier:
+            for action, neighbor in neighbors(state):
+                if neighbor in parents:
+                    continue
+                parents[neighbor] = (action, state)
+                dist[neighbor] = depth
+                layer.append(neighbor)
+                if neighbor in other_dist:
+                    length = depth + other_dist[neighbor]
+                    if best is None or length < best:
+                        best = length
+                        meeting = neighbor
+
+        if parents is forward:
+            forward_frontier = layer
+        else:
+            backward_frontier = layer
+
+        # No undiscovered path can be shorter than the best one found
+        if best is not None and best <= forward_depth + backward_depth + 1:
+            break
+
+    if meeting is None:
+        return None
+    return join_paths(forward, backward, meeting)
+
+
+def join_paths(forward, backward, meeting):
+    """
+    Returns the (action, state) path from the root of `forward` to the
+    root of `backward` through the state `meeting`.
+    """
+    path = []
+    state = meeting
+    while forward[state] is not None:
+        action, parent = forward[state]
+        path.append((action, state))
+        state = parent
+    path.reverse()
+
+    state = meeting
+    while backward[state] is not None:
+        action, child = backward[state]
+        path.append((action, child))
+        state = child
+    return path
+
+
+def reverse_path(source, path):
+    """
+    Returns the (action, state) path that walks `path`, which starts
+    at `source`, backwards from its last state to `source`.
+    """
+    states = [source] + [state for _, state in path]
+    return [
+        (path[i][0], states[i])
+        for i in range(len(path) - 1, -1, -1)
+    ]
+
+
+class BreadthFirstTree():
+    """
+    Breadth-first search tree rooted at `source`, grown one layer
+    at a time and only as far as the queries asked of it need.
+    """
+
+    def __init__(self, source, neighbors):
+        self.source = source
+        self.neighbors = neighbors
+
+        # Maps each discovered state to the (action, state) pair it was reached by
+        self.parents = {source: None}
+        self.frontier = [source]
+        self.depth = 0
+
+    def expand(self):
+        """
+        Adds the next layer to the tree.
+        Returns False if the tree already spans everything reachable.
+        """
+        if not self.frontier:
+            return False
+        parents = self.parents
+        layer = []
+        for state in self.frontier:
+            for action, neighbor in self.neighbors(state):
+                if neighbor not in parents:
+                    parents[neighbor] = (action, state)
+                    layer.append(neighbor)
+        self.frontier = layer
+        self.depth += 1
+        return True
+
+    def path_to(self, target):
+        """
+        Returns the shortest list of (action, state) pairs that connect
+        the root to `target`, growing the tree as needed.
+
+        If no possible path, returns None.
+        """
+        while target not in self.parents:
+            if not self.expand():
+                return None
+        path = []
+        state = target
+        while self.parents[state] is not None:
+            action, parent = self.parents[state]
+            path.append((action, state))
+            state = parent
+        path.reverse()
+        return path
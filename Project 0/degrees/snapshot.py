@@ -0,0 +1,299 @@
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Mapping
+
+from graph import CompactGraph
+
+# Snapshot file written next to the CSV files it was built from
+SNAPSHOT = "degrees.snapshot"
+
+# Bump whenever the layout below changes, so stale snapshots are rebuilt
+MAGIC = b"DEGREES\0"
+VERSION = 2
+
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+
+# Layout: MAGIC, then a little-endian u32 version and u64 header length,
+# then a JSON header describing each section, then the 8-byte aligned
+# sections themselves in native byte order.
+PREAMBLE = struct.Struct("<8sIQ")
+
+
+def signature(directory):
+    """
+    Returns the size and modification time of each source CSV file,
+    used to tell whether a snapshot is still current.
+    """
+    result = {}
+    for filename in SOURCES:
+        stat = os.stat(os.path.join(directory, filename))
+        result[filename] = [stat.st_size, stat.st_mtime_ns]
+    return result
+
+
+def write(directory, graph, people, movies):
+    """
+    Write a snapshot of a compact graph and its people and movies
+    metadata into `directory`. Returns the snapshot's path.
+    """
+    person_ids = graph.person_ids
+    movie_ids = graph.movie_ids
+    person_names = [people[person_id]["name"] for person_id in person_ids]
+
+    sections = {}
+    for name, strings in [
+        ("person_ids", person_ids),
+        ("person_names", person_names),
+        ("person_births", [people[i]["birth"] for i in person_ids]),
+        ("movie_ids", movie_ids),
+        ("movie_titles", [movies[i]["title"] for i in movie_ids]),
+        ("movie_years", [movies[i]["year"] for i in movie_ids]),
+    ]:
+        offsets, blob = encode_strings(strings)
+        sections[name + ".offsets"] = offsets
+        sections[name + ".blob"] = blob
+
+    sections["person_order"] = sorted_order(person_ids)
+    sections["movie_order"] = sorted_order(movie_ids)
+    sections["name_order"] = sorted_order([n.lower() for n in person_names])
+    sections["person_offsets"] = graph.person_offsets
+    sections["person_movies"] = graph.person_movies
+    sections["movie_offsets"] = graph.movie_offsets
+    sections["movie_stars"] = graph.movie_stars
+
+    # Lay the sections out one after another, each aligned to 8 bytes
+    table = {}
+    position = 0
+    for name, data in sections.items():
+        table[name] = [data.typecode, position, len(data)]
+        position += align(len(data) * data.itemsize)
+    header = json.dumps({
+        "byteorder": sys.byteorder,
+        "sources": signature(directory),
+        "years": None if graph.years is None else list(graph.years),
+        "sections": table,
+    }).encode("utf-8")
+    start = align(PREAMBLE.size + len(header))
+
+    path = os.path.join(directory, SNAPSHOT)
+    partial = path + ".partial"
+    with open(partial, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, data in sections.items():
+            f.seek(start + table[name][1])
+            data.tofile(f)
+        f.truncate(start + position)
+    os.replace(partial, path)
+    return path
+
+
+def load(directory, years=None):
+    """
+    Memory-map the snapshot in `directory`.
+
+    Returns a (graph, people, names, movies) tuple shaped like the
+    globals in degrees.py, or None if there is no snapshot, it is out
+    of date with respect to the CSV files, or it was not filtered to
+    the same `years` range.
+    """
+    path = os.path.join(directory, SNAPSHOT)
+    try:
+        with open(path, "rb") as f:
+            magic, version, length = PREAMBLE.unpack(f.read(PREAMBLE.size))
+            if magic != MAGIC or version != VERSION:
+                return None
+            header = json.loads(f.read(length))
+            if (header["byteorder"] != sys.byteorder
+                    or header["sources"] != signature(directory)
+                    or header["years"] != (None if years is None else list(years))):
+                return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, struct.error):
+        return None
+
+    start = align(PREAMBLE.size + length)
+    view = memoryview(mapped)
+    sections = {}
+    for name, (typecode, offset, count) in header["sections"].items():
+        size = count * array(typecode).itemsize
+        sections[name] = view[start + offset:start + offset + size].cast(typecode)
+
+    def strings(name):
+        return StringTable(sections[name + ".offsets"], sections[name + ".blob"])
+
+    person_ids = strings("person_ids")
+    movie_ids = strings("movie_ids")
+    person_names = strings("person_names")
+    person_index = SortedIndex(person_ids, sections["person_order"])
+    movie_index = SortedIndex(movie_ids, sections["movie_order"])
+    name_index = SortedIndex(person_names, sections["name_order"], str.lower)
+
+    graph = CompactGraph(
+        person_ids, movie_ids,
+        sections["person_offsets"], sections["person_movies"],
+        sections["movie_offsets"], sections["movie_stars"],
+        person_index=person_index, movie_index=movie_index,
+        years=None if years is None else tuple(years)
+    )
+    people = RecordView(person_index, {
+        "name": person_names,
+        "birth": strings("person_births"),
+    })
+    movies = RecordView(movie_index, {
+        "title": strings("movie_titles"),
+        "year": strings("movie_years"),
+    })
+    names = NameView(name_index, person_ids)
+    return graph, people, names, movies
+
+
+def align(n):
+    """Rounds `n` up to a multiple of 8."""
+    return (n + 7) & ~7
+
+
+def encode_strings(strings):
+    """
+    Returns (offsets, blob) arrays holding `strings` as UTF-8,
+    where string `i` is `blob[offsets[i]:offsets[i + 1]]`.
+    """
+    offsets = array("q", [0])
+    blob = bytearray()
+    for s in strings:
+        blob += s.encode("utf-8")
+        offsets.append(len(blob))
+    return offsets, array("B", blob)
+
+
+def sorted_order(keys):
+    """Returns the indices of `keys` in sorted key order."""
+    return array("i", sorted(range(len(keys)), key=keys.__getitem__))
+
+
+class StringTable():
+    """
+    Read-only sequence of strings decoded on access
+    from a table written by `encode_strings`.
+    """
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        if not 0 <= i < len(self):
+            raise IndexError("string table index out of range")
+        return str(self.blob[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class SortedIndex(Mapping):
+    """
+    Maps keys to their positions in a sequence, by binary search
+    over a precomputed sorted order of that sequence.
+
+    With `key`, entries are compared as `key(sequence[i])`, and
+    several positions may share one key.
+    """
+
+    def __init__(self, sequence, order, key=None):
+        self.sequence = sequence
+        self.order = order
+        self.key = key
+
+    def at(self, k):
+        """Returns the key at sorted position `k`."""
+        value = self.sequence[self.order[k]]
+        return value if self.key is None else self.key(value)
+
+    def lower(self, value):
+        """Returns the first sorted position whose key is not below `value`."""
+        low, high = 0, len(self.order)
+        while low < high:
+            middle = (low + high) // 2
+            if self.at(middle) < value:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def find_all(self, value):
+        """Returns every position whose key equals `value`."""
+        positions = []
+        k = self.lower(value)
+        while k < len(self.order) and self.at(k) == value:
+            positions.append(self.order[k])
+            k += 1
+        return positions
+
+    def __getitem__(self, value):
+        k = self.lower(value)
+        if k < len(self.order) and self.at(k) == value:
+            return self.order[k]
+        raise KeyError(value)
+
+    def __iter__(self):
+        return iter(self.sequence)
+
+    def __len__(self):
+        return len(self.sequence)
+
+
+class RecordView(Mapping):
+    """
+    Read-only mapping from an id to a dictionary of its fields,
+    shaped like the `people` and `movies` globals in degrees.py.
+    """
+
+    def __init__(self, index, fields):
+        self.index = index
+        self.fields = fields
+
+    def __getitem__(self, key):
+        i = self.index[key]
+        return {field: values[i] for field, values in self.fields.items()}
+
+    def __iter__(self):
+        return iter(self.index)
+
+    def __len__(self):
+        return len(self.index)
+
+
+class NameView(Mapping):
+    """
+    Read-only mapping from a lowercased name to the set of
+    person_ids with that name, like the `names` global in degrees.py.
+    """
+
+    def __init__(self, index, person_ids):
+        self.index = index
+        self.person_ids = person_ids
+
+    def __getitem__(self, name):
+        positions = self.index.find_all(name)
+        if not positions:
+            raise KeyError(name)
+        return {self.person_ids[i] for i in positions}
+
+    def __iter__(self):
+        previous = None
+        for k in range(len(self.index.order)):
+            name = self.index.at(k)
+            if name != previous:
+                yield name
+                previous = name
+
+    def __len__(self):
+        return sum(1 for _ in self)
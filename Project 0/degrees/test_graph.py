@@ -0,0 +1,66 @@
+from array import array
+
+import graph
+from graph import CompactGraph
+
+
+def chain(length):
+    """
+    Returns a CompactGraph of `length` people, where person i and
+    person i + 1 star together in movie i.
+    """
+    people = array("i")
+    movies = array("i")
+    for i in range(length - 1):
+        people.extend([i, i + 1])
+        movies.extend([i, i])
+    return CompactGraph.from_edges(
+        [str(i) for i in range(length)], [f"m{i}" for i in range(length - 1)],
+        people, movies
+    )
+
+
+def test_merge_folds_edits_into_arrays():
+    g = chain(100)
+    g.add_star(0, 5)
+    g.remove_star(1, 0)
+    g.merge()
+
+    assert not g.edited
+    assert g.added_movies == {} and g.added_stars == {} and g.removed == set()
+    assert list(g.movies_for(0)) == [0, 5]
+    assert list(g.stars_for(0)) == [0]
+    assert g.in_arrays(0, 5) and not g.in_arrays(1, 0)
+    assert g.edge_count() == len(g.person_movies) == 198
+
+
+def test_edits_merge_past_threshold():
+    g = chain(100)
+    limit = int(graph.MERGE_FRACTION * len(g.person_movies))
+    for movie in range(2, 2 + limit):
+        g.add_star(0, movie)
+    assert g.edited
+
+    g.add_star(0, 2 + limit)
+    assert not g.edited
+    assert list(g.movies_for(0)) == [0] + list(range(2, 3 + limit))
+    assert g.shortest_path("0", "99") is not None
+
+
+def test_readded_ids_reuse_their_index():
+    g = chain(100)
+    person = g.person_index["5"]
+    for movie in list(g.movies_for(person)):
+        g.remove_star(person, movie)
+    for star in list(g.stars_for(7)):
+        g.remove_star(star, 7)
+    g.remove_person("5")
+    g.remove_movie("m7")
+    assert "5" not in g.person_index and "m7" not in g.movie_index
+
+    assert g.add_person("5") == person
+    assert g.add_movie("m7") == 7
+    assert len(g.person_ids) == 100 and len(g.movie_ids) == 99
+    assert g.add_star(person, 7)
+    g.merge()
+    assert len(g.person_offsets) == 101 and list(g.movies_for(person)) == [7]
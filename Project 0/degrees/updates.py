@@ -0,0 +1,305 @@
+import os
+import sys
+import time
+from collections.abc import MutableMapping
+
+import degrees
+import ingest
+
+
+def main():
+    args = sys.argv[1:]
+    flags = {arg for arg in args if arg.startswith("--")}
+    args = [arg for arg in args if arg not in flags]
+    if len(args) != 2 or flags - {"--compact", "--snapshot", "--landmarks"}:
+        sys.exit("Usage: python updates.py [--compact] [--snapshot] "
+                 "[--landmarks] directory delta")
+    directory, delta = args
+    compact = "--compact" in flags or "--landmarks" in flags
+
+    print("Loading data...")
+    start = time.perf_counter()
+    degrees.load_data(directory, compact, "--snapshot" in flags)
+    if "--landmarks" in flags and not degrees.load_landmarks(directory):
+        print("No current landmark index; run landmarks.py to build one.")
+    print(f"Data loaded in {time.perf_counter() - start:.2f} s.")
+
+    start = time.perf_counter()
+    counts = load_delta(delta)
+    milliseconds = (time.perf_counter() - start) * 1000
+    changes = ", ".join(f"{n} {change}" for change, n in counts.items() if n)
+    print(f"Applied {changes or 'no changes'} in {milliseconds:.1f} ms.")
+
+
+class Overlay(MutableMapping):
+    """
+    Editable mapping over a read-only one, such as the views of a
+    memory-mapped snapshot, keeping changed and deleted keys aside.
+    """
+
+    def __init__(self, base):
+        self.base = base
+        self.changed = {}
+        self.deleted = set()
+
+    def __getitem__(self, key):
+        if key in self.changed:
+            return self.changed[key]
+        if key in self.deleted:
+            raise KeyError(key)
+        return self.base[key]
+
+    def __setitem__(self, key, value):
+        self.changed[key] = value
+        self.deleted.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.changed.pop(key, None)
+        if key in self.base:
+            self.deleted.add(key)
+
+    def __iter__(self):
+        for key in self.base:
+            if key not in self.deleted and key not in self.changed:
+                yield key
+        yield from self.changed
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+
+def editable():
+    """
+    Makes the `people`, `movies` and `names` globals of degrees.py
+    editable, wrapping any read-only snapshot views in an Overlay.
+    """
+    indexed = degrees.name_index is not None and degrees.name_index.names is degrees.names
+    if not isinstance(degrees.people, MutableMapping):
+        degrees.people = Overlay(degrees.people)
+    if not isinstance(degrees.movies, MutableMapping):
+        degrees.movies = Overlay(degrees.movies)
+    if not isinstance(degrees.names, MutableMapping):
+        degrees.names = Overlay(degrees.names)
+    if indexed:
+        degrees.name_index.names = degrees.names
+
+
+def changed():
+    """Marks the loaded graph as changed, invalidating cached paths."""
+    degrees.graph_version += 1
+
+
+def index_name(name):
+    """Adds `name` to the name index, if one has been built."""
+    if degrees.name_index is not None and degrees.name_index.names is degrees.names:
+        degrees.name_index.add(name.lower())
+
+
+def unindex_name(person_id, name):
+    """
+    Removes `person_id` from the people called `name`,
+    dropping the name from the name index if nobody is left.
+    """
+    key = name.lower()
+    person_ids = set(degrees.names.get(key, ()))
+    person_ids.discard(person_id)
+    if person_ids:
+        degrees.names[key] = person_ids
+        return
+    degrees.names.pop(key, None)
+    if degrees.name_index is not None and degrees.name_index.names is degrees.names:
+        degrees.name_index.remove(key)
+
+
+def add_movie(movie_id, title, year):
+    """
+    Adds a movie, or updates the title and year of an existing one.
+    Returns False if the movie falls outside the years the graph was
+    loaded for, and so was not added.
+    """
+    graph = degrees.graph
+    if graph is not None and not ingest.in_years(year, graph.years):
+        return False
+    editable()
+    record = {"title": title, "year": year}
+    if graph is None:
+        previous = degrees.movies.get(movie_id)
+        record["stars"] = set() if previous is None else previous["stars"]
+    else:
+        graph.add_movie(movie_id)
+    degrees.movies[movie_id] = record
+    changed()
+    return True
+
+
+def add_person(person_id, name, birth):
+    """Adds a person, or updates the name and birth year of an existing one."""
+    editable()
+    graph = degrees.graph
+    record = {"name": name, "birth": birth}
+    previous = degrees.people.get(person_id)
+    if previous is not None:
+        unindex_name(person_id, previous["name"])
+    if graph is None:
+        record["movies"] = set() if previous is None else previous["movies"]
+    else:
+        graph.add_person(person_id)
+        if degrees.landmark_index is not None:
+            degrees.landmark_index.grow(len(graph.person_ids))
+    degrees.people[person_id] = record
+    key = name.lower()
+    degrees.names[key] = set(degrees.names.get(key, ())) | {person_id}
+    index_name(name)
+    changed()
+
+
+def add_star(person_id, movie_id):
+    """
+    Records that a person starred in a movie, both of which must
+    already be loaded. Returns whether the credit is new.
+    """
+    if person_id not in degrees.people:
+        raise KeyError(person_id)
+    if movie_id not in degrees.movies:
+        raise KeyError(movie_id)
+    graph = degrees.graph
+    if graph is None:
+        stars = degrees.movies[movie_id]["stars"]
+        if person_id in stars:
+            return False
+        stars.add(person_id)
+        degrees.people[person_id]["movies"].add(movie_id)
+    else:
+        movie = graph.movie_index[movie_id]
+        if not graph.add_star(graph.person_index[person_id], movie):
+            return False
+        if degrees.landmark_index is not None:
+            degrees.landmark_index.connect(graph, movie)
+    changed()
+    return True
+
+
+def remove_star(person_id, movie_id):
+    """
+    Removes a person's credit in a movie.
+    Returns whether there was one.
+    """
+    if person_id not in degrees.people or movie_id not in degrees.movies:
+        return False
+    graph = degrees.graph
+    if graph is None:
+        stars = degrees.movies[movie_id]["stars"]
+        if person_id not in stars:
+            return False
+        stars.discard(person_id)
+        degrees.people[person_id]["movies"].discard(movie_id)
+    else:
+        person = graph.person_index[person_id]
+        movie = graph.movie_index[movie_id]
+        if not graph.remove_star(person, movie):
+            return False
+        if degrees.landmark_index is not None:
+            degrees.landmark_index.disconnect(graph, person, movie)
+    changed()
+    return True
+
+
+def remove_person(person_id):
+    """
+    Removes a person and all of their credits.
+    Returns whether they were loaded.
+    """
+    if person_id not in degrees.people:
+        return False
+    editable()
+    graph = degrees.graph
+    if graph is None:
+        movie_ids = list(degrees.people[person_id]["movies"])
+    else:
+        person = graph.person_index[person_id]
+        movie_ids = [graph.movie_ids[movie] for movie in graph.movies_for(person)]
+    for movie_id in movie_ids:
+        remove_star(person_id, movie_id)
+
+    # The person's interned index stays allocated, with no credits,
+    # and is reused if they are added again
+    unindex_name(person_id, degrees.people[person_id]["name"])
+    del degrees.people[person_id]
+    if graph is not None:
+        graph.remove_person(person_id)
+    changed()
+    return True
+
+
+def remove_movie(movie_id):
+    """
+    Removes a movie and every credit in it.
+    Returns whether it was loaded.
+    """
+    if movie_id not in degrees.movies:
+        return False
+    editable()
+    graph = degrees.graph
+    if graph is None:
+        person_ids = list(degrees.movies[movie_id]["stars"])
+    else:
+        movie = graph.movie_index[movie_id]
+        person_ids = [graph.person_ids[star] for star in graph.stars_for(movie)]
+    for person_id in person_ids:
+        remove_star(person_id, movie_id)
+
+    del degrees.movies[movie_id]
+    if graph is not None:
+        graph.remove_movie(movie_id)
+    changed()
+    return True
+
+
+def load_delta(directory):
+    """
+    Adds the movies, people and star credits in the CSV files of
+    `directory`, shaped like the full dataset, to the loaded data.
+    Any of the three files may be missing.
+
+    Edits to a compact graph are merged into its arrays at the end, so
+    later searches read adjacency from them alone again.
+
+    Returns a dictionary counting what was added and skipped.
+    """
+    counts = {
+        "movies": 0, "people": 0, "stars": 0,
+        "skipped movies": 0, "skipped stars": 0,
+    }
+
+    def present(filename):
+        return os.path.exists(os.path.join(directory, filename))
+
+    if present("movies.csv"):
+        for chunk in ingest.rows(directory, "movies.csv", ["id", "title", "year"]):
+            for movie_id, title, year in chunk:
+                if add_movie(movie_id, title, year):
+                    counts["movies"] += 1
+                else:
+                    counts["skipped movies"] += 1
+    if present("people.csv"):
+        for chunk in ingest.rows(directory, "people.csv", ["id", "name", "birth"]):
+            for person_id, name, birth in chunk:
+                add_person(person_id, name, birth)
+                counts["people"] += 1
+    if present("stars.csv"):
+        for chunk in ingest.rows(directory, "stars.csv", ["person_id", "movie_id"]):
+            for person_id, movie_id in chunk:
+                try:
+                    if add_star(person_id, movie_id):
+                        counts["stars"] += 1
+                except KeyError:
+                    counts["skipped stars"] += 1
+    if degrees.graph is not None:
+        degrees.graph.merge()
+    return counts
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import heredity
+import inference
+
+# Families each worker process is handed at once
+BATCH = 16
+
+# Conditional tables of heredity.PROBS, computed once per process and
+# shared by every family it scores
+TABLES = inference.conditional_tables(heredity.PROBS)
+
+FIELDS = ["family", "person", "gene_2", "gene_1", "gene_0", "trait_true", "trait_false", "ms", "error"]
+
+
+def main():
+    args = sys.argv[1:]
+    processes = os.cpu_count()
+    for arg in [arg for arg in args if arg.startswith("--processes=")]:
+        processes = int(arg.split("=", 1)[1])
+        args.remove(arg)
+    flags = {arg for arg in args if arg.startswith("--")}
+    args = [arg for arg in args if arg not in flags]
+    if len(args) != 1 or flags - {"--csv"}:
+        sys.exit("Usage: python batch.py [--csv] [--processes=N] directory|manifest")
+
+    write = write_csv(sys.stdout) if "--csv" in flags else write_json(sys.stdout)
+    stats = run(families(args[0]), write, processes)
+    report(stats, sys.stderr)
+
+
+def families(source):
+    """
+    Return the paths of the family CSV files in directory `source`, or
+    listed one to a line in manifest file `source`. Blank lines and lines
+    starting with # are left out, and relative paths are taken from the
+    manifest's own directory.
+    """
+    if os.path.isdir(source):
+        return sorted(
+            os.path.join(source, filename) for filename in os.listdir(source)
+            if filename.endswith(".csv")
+        )
+    base = os.path.dirname(source)
+    with open(source, encoding="utf-8") as f:
+        return [
+            os.path.join(base, line.strip()) for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        ]
+
+
+def solve(path):
+    """
+    Return a result dictionary for the family in the CSV file at `path`,
+    with its probabilities as `inference.marginals` computes them or the
+    error that stopped them, and the milliseconds it took.
+    """
+    start = time.perf_counter()
+    result = {"family": path}
+    try:
+        people = heredity.load_data(path)
+        result["probabilities"] = inference.marginals(people, heredity.PROBS, TABLES)
+    except (OSError, KeyError, ValueError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+def solve_all(paths, processes):
+    """
+    Yield a result from `solve` for each of `paths`, in order, from
+    `processes` worker processes handed BATCH families at a time.
+    """
+    if processes == 1 or len(paths) <= BATCH:
+        yield from map(solve, paths)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        yield from pool.imap(solve, paths, chunksize=BATCH)
+
+
+def write_json(out):
+    """Return a function writing each result to `out` as a JSON line."""
+    def write(result):
+        out.write(json.dumps(result) + "\n")
+    return write
+
+
+def write_csv(out):
+    """
+    Return a function writing each result to `out` as CSV rows of FIELDS,
+    one per person, or a single row with the error.
+    """
+    writer = csv.DictWriter(out, FIELDS)
+    writer.writeheader()
+
+    def write(result):
+        if "error" in result:
+            writer.writerow({"family": result["family"], "ms": result["ms"], "error": result["error"]})
+            return
+        for person, probabilities in result["probabilities"].items():
+            writer.writerow({
+                "family": result["family"],
+                "person": person,
+                "gene_2": probabilities["gene"][2],
+                "gene_1": probabilities["gene"][1],
+                "gene_0": probabilities["gene"][0],
+                "trait_true": probabilities["trait"][True],
+                "trait_false": probabilities["trait"][False],
+                "ms": result["ms"],
+            })
+    return write
+
+
+def run(paths, write, processes):
+    """
+    Solves the family in each of `paths`, passing each result to `write`
+    in order. Returns the per-family times in milliseconds, the number
+    of families that failed and the total wall time in seconds.
+    """
+    times = []
+    failures = 0
+    start = time.perf_counter()
+    for result in solve_all(paths, processes):
+        times.append(result["ms"])
+        failures += "error" in result
+        write(result)
+    return times, failures, time.perf_counter() - start
+
+
+def report(stats, out):
+    """Writes family count, failures, throughput and timing percentiles to `out`."""
+    times, failures, seconds = stats
+    if not times:
+        print("No families.", file=out)
+        return
+    ordered = sorted(times)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+    print(f"{len(ordered)} families in {seconds:.2f} s "
+          f"({len(ordered) / seconds:.1f} families/s), {failures} failed", file=out)
+    print(f"Time per family ms: mean {sum(ordered) / len(ordered):.2f}, "
+          f"p50 {percentile(50):.2f}, p99 {percentile(99):.2f}, "
+          f"max {ordered[-1]:.2f}", file=out)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 import csv
-import itertools
 import sys
 
+import inference
+import sampling
+
 PROBS = {
 
     # Unconditional probabilities for having gene
@@ -40,9 +42,69 @@ PROBS = {
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    args = sys.argv[1:]
+    usage = ("Usage: python heredity.py [--enumerate | --likelihood | --gibbs] "
+             "[--samples=N] [--seed=S] [--processes=N] data.csv")
+    options = {"--samples": sampling.SAMPLES, "--seed": None, "--processes": 1}
+    for arg in [arg for arg in args if arg.split("=", 1)[0] in options]:
+        name, _, value = arg.partition("=")
+        try:
+            options[name] = int(value)
+        except ValueError:
+            sys.exit(usage)
+        args.remove(arg)
+    flags = {arg for arg in args if arg.startswith("--")}
+    args = [arg for arg in args if arg not in flags]
+    if (len(args) != 1 or len(flags) > 1 or options["--samples"] < 1
+            or flags - {"--enumerate", "--likelihood", "--gibbs"}):
+        sys.exit(usage)
+    people = load_data(args[0])
+
+    # Enumerating every assignment is exponential, so by default
+    # variable elimination computes the same probabilities exactly;
+    # pedigrees too tangled even for that can be sampled instead
+    errors = None
+    skipped = []
+    sample = dict(
+        samples=options["--samples"], seed=options["--seed"],
+        processes=options["--processes"]
+    )
+    if "--enumerate" in flags:
+        probabilities = enumerate_probabilities(people, skipped=skipped)
+    elif "--likelihood" in flags:
+        probabilities, errors = sampling.likelihood_weighting(people, PROBS, **sample)
+    elif "--gibbs" in flags:
+        probabilities, errors = sampling.gibbs(people, PROBS, **sample)
+    else:
+        try:
+            probabilities = inference.marginals(people, PROBS)
+        except ValueError as e:
+            sys.exit(f"Cannot compute exactly: {e}. "
+                     "Try --likelihood or --gibbs to sample instead.")
+
+    # Print results
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                if errors is None:
+                    print(f"    {value}: {p:.4f}")
+                else:
+                    print(f"    {value}: {p:.4f} ± {errors[person][field][value]:.4f}")
+    if "--enumerate" in flags:
+        print(f"Skipped {sum(skipped)} assignments in {len(skipped)} branches "
+              "with zero probability")
+
+
+def enumerate_probabilities(people, topological=True, skipped=None):
+    """
+    Return gene and trait probabilities for each person by summing
+    the joint probability of every assignment consistent with the
+    known traits, as generated by `assignments`, which is passed
+    `topological` and `skipped`.
+    """
 
     # Keep track of gene and trait probabilities for each person
     probabilities = {
@@ -60,38 +122,13 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+    # Add up every assignment that could have happened
+    for one_gene, two_genes, have_trait, p in assignments(people, topological, skipped):
+        update(probabilities, one_gene, two_genes, have_trait, p)
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+    return probabilities
 
 
 def load_data(filename):
@@ -116,16 +153,116 @@ def load_data(filename):
     return data
 
 
-def powerset(s):
+def topological_order(people):
     """
-    Return a list of all possible subsets of set s.
+    Return a list of the people's names in which everyone comes after
+    their parents.
+    """
+    order = []
+    placed = set()
+    remaining = list(people)
+    while remaining:
+        ready = [
+            person for person in remaining
+            if {people[person]["mother"], people[person]["father"]} <= placed | {None}
+        ]
+        if not ready:
+            raise ValueError("pedigree has someone among their own ancestors")
+        order.extend(ready)
+        placed.update(ready)
+        remaining = [person for person in remaining if person not in placed]
+    return order
+
+
+def assignments(people, topological=True, skipped=None):
     """
-    s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
-            itertools.combinations(s, r) for r in range(len(s) + 1)
-        )
-    ]
+    Yield (one_gene, two_genes, have_trait, p) for each assignment of
+    gene counts and traits that agrees with the known traits and has a
+    joint probability p above zero.
+
+    People are assigned one at a time, sorted so parents come first if
+    `topological`, and each person's factor of the joint probability is
+    multiplied in as soon as they and their parents are assigned. A branch
+    whose product reaches zero is abandoned there, and if `skipped` is a
+    list, the number of assignments it held is appended to it.
+
+    The yielded sets change as enumeration goes on; copy them to keep them.
+    """
+    order = topological_order(people) if topological else list(people)
+    position = {person: i for i, person in enumerate(order)}
+    complete = [[] for _ in order]
+    for person in order:
+        family = {person, people[person]["mother"], people[person]["father"]} - {None}
+        complete[max(position[member] for member in family)].append(person)
+
+    # Assignments left to make below each depth
+    below = [1] * (len(order) + 1)
+    for depth in reversed(range(len(order))):
+        traits = 2 if people[order[depth]]["trait"] is None else 1
+        below[depth] = below[depth + 1] * 3 * traits
+
+    one_gene = set()
+    two_genes = set()
+    have_trait = set()
+
+    def extend(depth, p):
+        if depth == len(order):
+            yield one_gene, two_genes, have_trait, p
+            return
+        person = order[depth]
+        known = people[person]["trait"]
+        for gene, genes in ((0, None), (1, one_gene), (2, two_genes)):
+            if genes is not None:
+                genes.add(person)
+            for trait in ((True, False) if known is None else (known,)):
+                if trait:
+                    have_trait.add(person)
+                q = p
+                for member in complete[depth]:
+                    q *= person_probability(people, member, one_gene, two_genes, have_trait)
+                if q > 0:
+                    yield from extend(depth + 1, q)
+                elif skipped is not None:
+                    skipped.append(below[depth + 1])
+                have_trait.discard(person)
+            if genes is not None:
+                genes.discard(person)
+
+    yield from extend(0, 1)
+
+
+def no_of_genes(person, one_gene, two_genes):
+    """
+    Return how many copies of the gene `person` has, given the sets
+    of people with one and two copies.
+    """
+    if person in one_gene:
+        return 1
+    elif person in two_genes:
+        return 2
+    else:
+        return 0
+
+
+def trait_type(person, have_trait):
+    """
+    Return whether `person` has the trait, given the set of people who do.
+    """
+    return person in have_trait
+
+
+def from_parent(parent_gene):
+    """
+    Return the probability that a parent with `parent_gene` copies of the
+    gene passes one on, allowing for mutation.
+    """
+    mutation = PROBS["mutation"]
+    if parent_gene == 0:
+        return mutation
+    elif parent_gene == 2:
+        return 1 - mutation
+    else:
+        return 0.5
 
 
 def joint_probability(people, one_gene, two_genes, have_trait):
@@ -139,58 +276,38 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
-    def no_of_genes(person, one_gene, two_genes):
-        if person in one_gene:
-            return 1
-        elif person in two_genes:
-            return 2
-        else:
-            return 0
-    
-    def trait_type(person, have_trait):
-        if person in have_trait:
-            return True
-        else:
-            return False
-    
-    def from_parent(parent_gene):
-        if parent_gene == 0:
-            return ((0.01*0.5) + (0.01*0.5))
-        elif parent_gene == 2:
-            return ((0.99*0.5) + (0.99*0.5))
-        else:
-            return ((0.5*0.99) + (0.5*0.01))
-        
-    prob = 1    
-    
+    prob = 1
     for i in set(people):
-        gene = no_of_genes(i, one_gene, two_genes)
-        trait = trait_type(i, have_trait)
-        trait_prob = PROBS["trait"][gene][trait]
-        gene_prob = 0
-        
-        if (people[i]['mother'] == None) and (people[i]['father'] == None):
-            gene_prob = PROBS["gene"][gene]
-        else:
-            from_mom = 0
-            from_dad = 0
-            mom_gene = no_of_genes(people[i]['mother'], one_gene, two_genes)
-            dad_gene = no_of_genes(people[i]['father'], one_gene, two_genes)
-            from_mom = from_parent(mom_gene)
-            from_dad = from_parent(dad_gene)
-            if gene == 1:
-                gene_prob = (from_mom)*(1-from_dad) + (from_dad)*(1-from_mom)
-            elif gene == 0:
-                gene_prob = (1-from_mom)*(1-from_dad)
-            else:
-                gene_prob = (from_mom)*(from_dad)
-                
-        prob = (prob)*(gene_prob)*(trait_prob)
-        
+        prob *= person_probability(people, i, one_gene, two_genes, have_trait)
     return prob
     #raise NotImplementedError
 
 
+def person_probability(people, person, one_gene, two_genes, have_trait):
+    """
+    Return the probability that `person` has the gene count and trait
+    given by `one_gene`, `two_genes` and `have_trait`, given the gene
+    counts those sets give their parents.
+    """
+    gene = no_of_genes(person, one_gene, two_genes)
+    trait_prob = PROBS["trait"][gene][trait_type(person, have_trait)]
+
+    mother = people[person]["mother"]
+    father = people[person]["father"]
+    if mother is None and father is None:
+        return PROBS["gene"][gene] * trait_prob
+
+    from_mom = from_parent(no_of_genes(mother, one_gene, two_genes))
+    from_dad = from_parent(no_of_genes(father, one_gene, two_genes))
+    if gene == 1:
+        gene_prob = from_mom * (1 - from_dad) + from_dad * (1 - from_mom)
+    elif gene == 0:
+        gene_prob = (1 - from_mom) * (1 - from_dad)
+    else:
+        gene_prob = from_mom * from_dad
+    return gene_prob * trait_prob
+
+
 def update(probabilities, one_gene, two_genes, have_trait, p):
     """
     Add to `probabilities` a new joint probability `p`.
@@ -198,20 +315,6 @@ def update(probabilities, one_gene, two_genes, have_trait, p):
     Which value for each distribution is updated depends on whether
     the person is in `have_gene` and `have_trait`, respectively.
     """
-    def no_of_genes(person, one_gene, two_genes):
-        if person in one_gene:
-            return 1
-        elif person in two_genes:
-            return 2
-        else:
-            return 0
-    
-    def trait_type(person, have_trait):
-        if person in have_trait:
-            return True
-        else:
-            return False
-        
     for i in set(probabilities):
         gene = no_of_genes(i, one_gene, two_genes)
         trait = trait_type(i, have_trait)
@@ -0,0 +1,224 @@
+import heapq
+
+import numpy as np
+
+# Gene counts and trait values, in the order they index the tables below
+GENES = (0, 1, 2)
+TRAITS = (True, False)
+
+# Most people one cluster may hold; its table has 3 ** MAX_CLUSTER entries
+MAX_CLUSTER = 14
+
+
+def gene_prior(probs):
+    """Return the unconditional distribution of gene counts in `probs`."""
+    return np.array([probs["gene"][gene] for gene in GENES])
+
+
+def trait_table(probs):
+    """
+    Return a 3 by 2 array whose entry [g, t] is the probability of trait
+    value TRAITS[t] given GENES[g] copies of the gene.
+    """
+    return np.array([[probs["trait"][gene][trait] for trait in TRAITS] for gene in GENES])
+
+
+def inheritance_table(mutation):
+    """
+    Return a 3 by 3 by 3 array whose entry [c, m, f] is the probability
+    that a child has c copies of the gene given that the mother has m and
+    the father has f. Each parent passes on one of their copies, which
+    mutates with probability `mutation`.
+    """
+    passed = np.array([mutation, 0.5, 1 - mutation])
+    mother = passed[:, np.newaxis]
+    father = passed[np.newaxis, :]
+    return np.stack([
+        (1 - mother) * (1 - father),
+        mother * (1 - father) + (1 - mother) * father,
+        mother * father,
+    ])
+
+
+def conditional_tables(probs):
+    """
+    Return the `gene_prior`, `trait_table` and `inheritance_table` of
+    `probs`, which every pedigree scored with the same `probs` shares.
+    """
+    return gene_prior(probs), trait_table(probs), inheritance_table(probs["mutation"])
+
+
+def family_factors(people, probs, tables=None):
+    """
+    Return a list of (variables, table) factors whose product is the joint
+    probability of everyone's gene count and known traits: one factor per
+    person over their own gene count, then their parents'.
+
+    As in `joint_probability`, a missing parent of someone whose other
+    parent is known is taken to have no copies of the gene. The
+    `conditional_tables` of `probs` are used if given, else computed.
+    """
+    prior, traits, inherit = tables or conditional_tables(probs)
+
+    factors = []
+    for person, data in people.items():
+        mother = data["mother"]
+        father = data["father"]
+        if mother is None and father is None:
+            variables, table = (person,), prior
+        elif father is None:
+            variables, table = (person, mother), inherit[:, :, 0]
+        elif mother is None:
+            variables, table = (person, father), inherit[:, 0, :]
+        else:
+            variables, table = (person, mother, father), inherit
+
+        # Known traits weight each gene count by how likely the trait is
+        if data["trait"] is not None:
+            evidence = traits[:, TRAITS.index(data["trait"])]
+            table = table * evidence.reshape((3,) + (1,) * (table.ndim - 1))
+        factors.append((variables, table))
+    return factors
+
+
+def elimination_order(factors):
+    """
+    Return the variables of `factors` in a greedy minimum-fill order of
+    elimination, each with the set of variables it is still connected to
+    when it is eliminated. Ties go to the variable with fewer neighbours.
+    """
+    neighbours = {}
+    for variables, _ in factors:
+        for variable in variables:
+            neighbours.setdefault(variable, set()).update(variables)
+    for variable, others in neighbours.items():
+        others.discard(variable)
+
+    def cost(variable):
+        others = neighbours[variable]
+        missing = sum(len(others - neighbours[other]) - 1 for other in others)
+        return (missing // 2, len(others))
+
+    heap = [(cost(variable), variable) for variable in neighbours]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        key, variable = heapq.heappop(heap)
+        if variable not in neighbours or key != cost(variable):
+            continue
+        scope = neighbours.pop(variable)
+        order.append((variable, scope))
+
+        # Connect what is left of the eliminated variable's neighbourhood,
+        # which changes the cost of eliminating anything next to it
+        affected = set(scope)
+        for other in scope:
+            neighbours[other] |= scope
+            neighbours[other].discard(other)
+            neighbours[other].discard(variable)
+            affected |= neighbours[other]
+        for other in affected:
+            heapq.heappush(heap, (cost(other), other))
+    return order
+
+
+def contract(factors, output):
+    """
+    Return the product of (variables, table) `factors`, summed over every
+    variable not in `output`, as a table over `output` in that order.
+    """
+    labels = {}
+    operands = []
+    for variables, table in factors:
+        operands.append(table)
+        operands.append([labels.setdefault(variable, len(labels)) for variable in variables])
+    return np.einsum(*operands, [labels[variable] for variable in output])
+
+
+def gene_marginals(people, probs, tables=None):
+    """
+    Return a dictionary mapping each person to an array of the
+    probabilities of their gene counts given the known traits.
+
+    The pedigree's factors are eliminated one person at a time, which
+    builds a tree of clusters: each person with the relatives still
+    connected to them. Messages passed up that tree and back down again
+    leave every cluster with its joint distribution, so all marginals
+    come from two passes rather than one elimination per person.
+    """
+    factors = family_factors(people, probs, tables)
+    order = elimination_order(factors)
+    position = {variable: k for k, (variable, _) in enumerate(order)}
+
+    # Cluster k holds the k-th eliminated variable and its separator, the
+    # neighbours it shares with the cluster of whichever is eliminated next
+    clusters = []
+    separators = []
+    parents = []
+    for variable, scope in order:
+        separator = tuple(sorted(scope, key=position.get))
+        clusters.append((variable,) + separator)
+        separators.append(separator)
+        parents.append(position[separator[0]] if separator else None)
+    if max(map(len, clusters), default=0) > MAX_CLUSTER:
+        raise ValueError("pedigree has too many loops for exact inference")
+    children = [[] for _ in order]
+    for k, parent in enumerate(parents):
+        if parent is not None:
+            children[parent].append(k)
+
+    # Each factor joins the cluster of its first variable to be eliminated
+    assigned = [[(cluster, np.ones((3,) * len(cluster)))] for cluster in clusters]
+    for variables, table in factors:
+        assigned[min(position[variable] for variable in variables)].append((variables, table))
+
+    # Upward pass, from the first cluster eliminated to the last, with
+    # each message rescaled so long pedigrees do not underflow
+    up = [None] * len(order)
+    for k in range(len(order)):
+        if parents[k] is None:
+            continue
+        message = contract(
+            assigned[k] + [(separators[c], up[c]) for c in children[k]], separators[k]
+        )
+        up[k] = message / message.sum()
+
+    # Downward pass, dividing out what a child sent up from what it gets back
+    down = [None] * len(order)
+    marginals = {}
+    for k in reversed(range(len(order))):
+        incoming = assigned[k] + [(separators[c], up[c]) for c in children[k]]
+        if parents[k] is not None:
+            incoming.append((separators[k], down[k]))
+        belief = contract(incoming, clusters[k])
+        belief /= belief.sum()
+        marginals[clusters[k][0]] = belief.reshape(3, -1).sum(axis=1)
+        for c in children[k]:
+            projected = contract([(clusters[k], belief)], separators[c])
+            down[c] = np.divide(
+                projected, up[c], out=np.zeros_like(projected), where=up[c] != 0
+            )
+    return marginals
+
+
+def marginals(people, probs, tables=None):
+    """
+    Return the probabilities of each person's gene count and trait given
+    the known traits, in the same shape `heredity.py` prints them,
+    using the `conditional_tables` of `probs` if given.
+    """
+    tables = tables or conditional_tables(probs)
+    genes = gene_marginals(people, probs, tables)
+    traits = tables[1]
+    probabilities = {}
+    for person, data in people.items():
+        gene = genes[person]
+        if data["trait"] is None:
+            trait = gene @ traits
+        else:
+            trait = np.array([float(data["trait"] == value) for value in TRAITS])
+        probabilities[person] = {
+            "gene": {count: float(gene[GENES.index(count)]) for count in (2, 1, 0)},
+            "trait": {value: float(trait[TRAITS.index(value)]) for value in TRAITS},
+        }
+    return probabilities
@@ -0,0 +1,180 @@
+import sys
+import time
+
+import numpy as np
+
+import inference
+
+# Gene assignments scored at once by `enumerate_marginals`
+CHUNK = 1 << 16
+
+
+def main():
+    if len(sys.argv) != 2:
+        sys.exit("Usage: python joint.py data.csv")
+
+    # Imported here, as heredity.py imports this module through sampling.py
+    import heredity
+    people = heredity.load_data(sys.argv[1])
+
+    start = time.perf_counter()
+    skipped = []
+    expected = heredity.enumerate_probabilities(people, skipped=skipped)
+    looped = time.perf_counter() - start
+
+    start = time.perf_counter()
+    probabilities = enumerate_marginals(people, heredity.PROBS)
+    batched = time.perf_counter() - start
+
+    difference = max(
+        abs(probabilities[person][field][value] - expected[person][field][value])
+        for person in people
+        for field in expected[person]
+        for value in expected[person][field]
+    )
+    if difference > 1e-9:
+        sys.exit(f"Batched enumeration differs from heredity.py by {difference:.2e}.")
+    print(f"Enumerated {len(people)} people")
+    print(f"joint_probability loop: {looped:.3f} s, skipping {sum(skipped)} "
+          f"assignments in {len(skipped)} branches with zero probability")
+    print(f"joint_probabilities in chunks of {CHUNK}: {batched:.3f} s "
+          f"({looped / batched:.0f}x)")
+
+
+class Family():
+    """
+    People of a pedigree numbered 0 to n - 1 in the order of `names`.
+
+    `mothers` and `fathers` give each person's parents by number, or n
+    for a parent who is not known. `evidence` is 1 for a person known to
+    have the trait, 0 for one known not to, and -1 otherwise.
+    """
+
+    def __init__(self, people):
+        self.names = list(people)
+        n = len(self.names)
+        index = {name: i for i, name in enumerate(self.names)}
+        index[None] = n
+        self.mothers = np.array([index[people[name]["mother"]] for name in self.names], dtype=np.intp)
+        self.fathers = np.array([index[people[name]["father"]] for name in self.names], dtype=np.intp)
+        self.evidence = np.array([
+            -1 if people[name]["trait"] is None else int(people[name]["trait"])
+            for name in self.names
+        ], dtype=np.int8)
+
+        # Founders have neither parent; everyone else is scored by inheritance,
+        # taking a missing parent to have no copies as `joint_probability` does
+        self.founders = np.flatnonzero((self.mothers == n) & (self.fathers == n))
+        self.children = np.flatnonzero((self.mothers != n) | (self.fathers != n))
+        self.unknown = np.flatnonzero(self.evidence < 0)
+
+        # Number people by generation, so parents come before children
+        depth = np.zeros(n + 1, dtype=np.intp)
+        depth[n] = -1
+        for _ in range(n + 1):
+            deeper = np.maximum(depth[self.mothers], depth[self.fathers]) + 1
+            if (deeper == depth[:n]).all():
+                break
+            depth[:n] = deeper
+        else:
+            raise ValueError("pedigree has someone among their own ancestors")
+        self.order = np.argsort(depth[:n], kind="stable")
+
+
+def person_tables(family, probs):
+    """
+    Return an n by 54 array holding each person's factor of the joint
+    probability. Entry [i, t * 27 + c * 9 + m * 3 + f] is the probability
+    that person i has c copies of the gene and trait value TRAITS[t],
+    given that their mother has m copies and their father f.
+    """
+    prior = inference.gene_prior(probs)
+    inherit = inference.inheritance_table(probs["mutation"])
+    traits = inference.trait_table(probs)
+    tables = np.empty((len(family.names), 2, 3, 3, 3))
+    founders = prior[:, np.newaxis, np.newaxis] * np.ones((3, 3, 3))
+    for t in range(2):
+        tables[family.founders, t] = founders * traits[:, t, np.newaxis, np.newaxis]
+        tables[family.children, t] = inherit * traits[:, t, np.newaxis, np.newaxis]
+    return tables.reshape(len(family.names), 54)
+
+
+def joint_probabilities(family, genes, traits, probs, tables=None):
+    """
+    Return the joint probability of each of k assignments at once, where
+    `genes` is a k by n array of gene counts and `traits` a k by n boolean
+    array of trait values for the people of `family`, or a single row of
+    trait values shared by all k.
+
+    Each row gives the same probability as `joint_probability` would for
+    the people with one gene, two genes and the trait in that row. The
+    `person_tables` of `family` and `probs` are used if given, else
+    computed.
+    """
+    if tables is None:
+        tables = person_tables(family, probs)
+    genes = np.asarray(genes, dtype=np.intp)
+    k, n = genes.shape
+
+    # An extra column of zeros stands in for every missing parent
+    padded = np.zeros((k, n + 1), dtype=np.intp)
+    padded[:, :n] = genes
+
+    # TRAITS lists True first, so a trait of True picks the first 27 entries
+    index = genes * 9
+    index += padded[:, family.mothers] * 3
+    index += padded[:, family.fathers]
+    index += np.where(traits, 0, 27) + 54 * np.arange(n)
+    return tables.ravel()[index].prod(axis=1)
+
+
+def enumerate_marginals(people, probs, chunk=CHUNK):
+    """
+    Return gene and trait probabilities for each person, in the same shape
+    as `heredity.enumerate_probabilities`, by scoring every assignment of
+    gene counts and of the unknown traits with `joint_probabilities`.
+
+    Gene assignments are taken `chunk` at a time, and each chunk is scored
+    once for every assignment of the unknown traits, all with the same
+    `person_tables`.
+    """
+    family = Family(people)
+    tables = person_tables(family, probs)
+    n = len(family.names)
+    powers = 3 ** np.arange(n)
+    known = family.evidence == 1
+
+    gene_sums = np.zeros((n, 3))
+    trait_sums = np.zeros(n)
+    weight = 0.0
+    for start in range(0, 3 ** n, chunk):
+
+        # Gene assignment i gives each person a base 3 digit of i
+        numbers = np.arange(start, min(start + chunk, 3 ** n))
+        genes = (numbers[:, np.newaxis] // powers) % 3
+
+        # Likewise each trait assignment gives each unknown person a bit
+        totals = np.zeros(len(numbers))
+        for bits in range(2 ** len(family.unknown)):
+            traits = known.copy()
+            traits[family.unknown] = (bits >> np.arange(len(family.unknown))) & 1
+            p = joint_probabilities(family, genes, traits, probs, tables)
+            totals += p
+            trait_sums += p.sum() * traits
+
+        for count in range(3):
+            gene_sums[:, count] += totals @ (genes == count)
+        weight += totals.sum()
+
+    return {
+        name: {
+            "gene": {count: float(gene_sums[i, count] / weight) for count in (2, 1, 0)},
+            "trait": {True: float(trait_sums[i] / weight),
+                      False: float(1 - trait_sums[i] / weight)},
+        }
+        for i, name in enumerate(family.names)
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,230 @@
+import multiprocessing
+
+import numpy as np
+
+import inference
+import joint
+
+# Samples drawn in all unless told otherwise
+SAMPLES = 100000
+
+# Independent batches of likelihood-weighted samples, whose spread gives
+# the confidence intervals
+BATCHES = 20
+
+# Independent Gibbs chains, advanced together, whose spread gives the
+# confidence intervals
+CHAINS = 64
+
+# Sweeps through every person each Gibbs chain makes before it is counted
+BURN_IN = 200
+
+# Confidence intervals are the estimate plus or minus Z standard errors
+Z = 1.96
+
+
+def likelihood_weighting(people, probs, samples=SAMPLES, seed=None, processes=1,
+                         batches=BATCHES):
+    """
+    Return estimated gene and trait probabilities for each person, in the
+    shape `inference.marginals` returns, and the half-width of a 95%
+    confidence interval around each.
+
+    Each sample draws everyone's gene count from their parents', parents
+    first, and is weighted by the probability of the known traits given
+    those counts. `samples` are split into `batches`, or one batch per
+    sample if there are fewer, shared out among `processes` worker
+    processes, and the spread of the batch estimates gives the intervals.
+
+    In large pedigrees with many known traits the weight falls on a few
+    samples, and the intervals are too narrow; `gibbs` copes better there.
+    """
+    if samples < 1:
+        raise ValueError("samples must be positive")
+    family = joint.Family(people)
+    batches = min(batches, samples)
+    sizes = np.diff(np.linspace(0, samples, batches + 1).astype(int))
+    tasks = [
+        (family, probs, size, child)
+        for size, child in zip(sizes, np.random.SeedSequence(seed).spawn(batches))
+    ]
+    return summarize(family, run(weighted_batch, tasks, processes))
+
+
+def gibbs(people, probs, samples=SAMPLES, seed=None, processes=1, chains=CHAINS,
+          burn_in=BURN_IN):
+    """
+    Return estimated gene and trait probabilities for each person, in the
+    shape `inference.marginals` returns, and the half-width of a 95%
+    confidence interval around each.
+
+    `chains` Gibbs chains start from samples of the pedigree ignoring the
+    known traits, then repeatedly redraw each person's gene count given
+    everyone else's. After `burn_in` sweeps through everyone, each chain
+    averages the distributions it redraws from until `samples` sweeps of
+    single chains have been made in all. Chains are shared out among
+    `processes` worker processes, and their spread gives the intervals.
+    """
+    if samples < 1:
+        raise ValueError("samples must be positive")
+    family = joint.Family(people)
+    processes = max(1, min(processes, chains))
+    sweeps = -(-samples // chains)
+    groups = np.diff(np.linspace(0, chains, processes + 1).astype(int))
+    tasks = [
+        (family, probs, size, sweeps, burn_in, child)
+        for size, child in zip(groups, np.random.SeedSequence(seed).spawn(processes))
+    ]
+    return summarize(family, run(gibbs_chains, tasks, processes))
+
+
+def run(worker, tasks, processes):
+    """
+    Return the estimates `worker` makes for each of `tasks`, stacked into
+    one array, using `processes` worker processes.
+    """
+    if processes == 1 or len(tasks) <= 1:
+        results = [worker(task) for task in tasks]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(worker, tasks)
+    return np.concatenate(results)
+
+
+def forward_samples(family, probs, size, rng):
+    """
+    Return a `size` by n + 1 array of gene counts drawn for the people of
+    `family` without regard to their traits, parents first. The extra
+    last column is zero, and stands in for every missing parent.
+    """
+    n = len(family.names)
+    prior = np.cumsum(inference.gene_prior(probs))
+    inherit = np.cumsum(inference.inheritance_table(probs["mutation"]), axis=0)
+    genes = np.zeros((size, n + 1), dtype=np.intp)
+    founder = np.zeros(n, dtype=bool)
+    founder[family.founders] = True
+
+    # A uniform draw falls past one, both or neither of the first two
+    # cumulative probabilities, which picks 0, 1 or 2 copies
+    for person in family.order:
+        u = rng.random(size)
+        if founder[person]:
+            cumulative = prior[:2, np.newaxis]
+        else:
+            cumulative = inherit[
+                :2, genes[:, family.mothers[person]], genes[:, family.fathers[person]]
+            ]
+        genes[:, person] = (u >= cumulative[0]).astype(np.intp) + (u >= cumulative[1])
+    return genes
+
+
+def weighted_batch(task):
+    """
+    Return a 1 by n by 4 array estimating, from one batch of likelihood
+    weighted samples, each person's probability of 0, 1 and 2 copies of
+    the gene and of the trait.
+    """
+    family, probs, size, seed = task
+    rng = np.random.default_rng(seed)
+    n = len(family.names)
+    genes = forward_samples(family, probs, size, rng)[:, :n]
+    traits = inference.trait_table(probs)
+
+    # Weights are kept as logarithms, as long pedigrees would underflow
+    known = np.flatnonzero(family.evidence >= 0)
+    columns = (family.evidence[known] == 0).astype(np.intp)
+    log_weights = np.log(traits[genes[:, known], columns]).sum(axis=1)
+    weights = np.exp(log_weights - log_weights.max())
+    weights /= weights.sum()
+
+    estimates = np.empty((1, n, 4))
+    for count in range(3):
+        estimates[0, :, count] = weights @ (genes == count)
+    estimates[0, :, 3] = weights @ traits[genes, 0]
+    return estimates
+
+
+def gibbs_chains(task):
+    """
+    Return a k by n by 4 array estimating, from each of k Gibbs chains,
+    each person's probability of 0, 1 and 2 copies of the gene and of
+    the trait.
+    """
+    family, probs, size, sweeps, burn_in, seed = task
+    rng = np.random.default_rng(seed)
+    n = len(family.names)
+    prior = inference.gene_prior(probs)
+    inherit = inference.inheritance_table(probs["mutation"])
+    traits = inference.trait_table(probs)
+    genes = forward_samples(family, probs, size, rng)
+    founder = np.zeros(n, dtype=bool)
+    founder[family.founders] = True
+
+    # Each person's children, to weigh how well each count explains them
+    children = [[] for _ in range(n)]
+    for child in family.children:
+        for parent in {family.mothers[child], family.fathers[child]} - {n}:
+            children[parent].append(child)
+
+    candidates = np.arange(3)
+    totals = np.zeros((size, n, 4))
+    for sweep in range(burn_in + sweeps):
+        for person in family.order:
+            if founder[person]:
+                weights = np.broadcast_to(prior, (size, 3)).copy()
+            else:
+                weights = inherit[
+                    :, genes[:, family.mothers[person]], genes[:, family.fathers[person]]
+                ].T.copy()
+            if family.evidence[person] >= 0:
+                weights *= traits[:, 1 - family.evidence[person]]
+            for child in children[person]:
+                mother = family.mothers[child]
+                father = family.fathers[child]
+                weights *= inherit[
+                    genes[:, child, np.newaxis],
+                    candidates if mother == person else genes[:, mother, np.newaxis],
+                    candidates if father == person else genes[:, father, np.newaxis],
+                ]
+            weights /= weights.sum(axis=1, keepdims=True)
+
+            # Average the distribution drawn from, not just the draw
+            if sweep >= burn_in:
+                totals[:, person, :3] += weights
+                totals[:, person, 3] += weights @ traits[:, 0]
+            cumulative = np.cumsum(weights, axis=1)
+            u = rng.random(size)
+            genes[:, person] = (u >= cumulative[:, 0]).astype(np.intp) + (u >= cumulative[:, 1])
+    return totals / sweeps
+
+
+def summarize(family, estimates):
+    """
+    Return the mean of k independent estimates, a k by n by 4 array as
+    `weighted_batch` and `gibbs_chains` make, in the shape
+    `inference.marginals` returns, and the half-width of a 95%
+    confidence interval around each probability.
+    """
+    mean = estimates.mean(axis=0)
+    if len(estimates) > 1:
+        error = Z * estimates.std(axis=0, ddof=1) / np.sqrt(len(estimates))
+    else:
+        error = np.full_like(mean, np.inf)
+
+    # Known traits are certain
+    known = family.evidence >= 0
+    mean[known, 3] = family.evidence[known]
+    error[known, 3] = 0
+
+    probabilities = {}
+    errors = {}
+    for i, name in enumerate(family.names):
+        probabilities[name] = {
+            "gene": {count: float(mean[i, count]) for count in (2, 1, 0)},
+            "trait": {True: float(mean[i, 3]), False: float(1 - mean[i, 3])},
+        }
+        errors[name] = {
+            "gene": {count: float(error[i, count]) for count in (2, 1, 0)},
+            "trait": {True: float(error[i, 3]), False: float(error[i, 3])},
+        }
+    return probabilities, errors
@@ -0,0 +1,37 @@
+import pytest
+
+import heredity
+
+# Lily cannot have the trait without a copy of the gene, so Harry's
+# copy must come from James
+PEOPLE = {
+    "Harry": {"name": "Harry", "mother": "Lily", "father": "James", "trait": True},
+    "James": {"name": "James", "mother": None, "father": None, "trait": None},
+    "Lily": {"name": "Lily", "mother": None, "father": None, "trait": False},
+}
+
+# The trait shows exactly when someone has a copy, and copies never mutate
+CERTAIN = {
+    "gene": {2: 0.01, 1: 0.03, 0: 0.96},
+    "trait": {
+        2: {True: 1, False: 0},
+        1: {True: 1, False: 0},
+        0: {True: 0, False: 1},
+    },
+    "mutation": 0,
+}
+
+
+def test_enumeration_skips_impossible_branches(monkeypatch):
+    monkeypatch.setattr(heredity, "PROBS", CERTAIN)
+    skipped = []
+    found = sum(1 for _ in heredity.assignments(PEOPLE, skipped=skipped))
+    assert sum(skipped) > 0
+
+    # Every assignment is either yielded or counted as skipped
+    assert found + sum(skipped) == 3 ** 3 * 2
+
+    probabilities = heredity.enumerate_probabilities(PEOPLE)
+    assert probabilities["Lily"]["gene"][0] == pytest.approx(1)
+    assert probabilities["James"]["gene"][0] == pytest.approx(0)
+    assert probabilities["James"]["trait"][True] == pytest.approx(1)
@@ -0,0 +1,41 @@
+import pytest
+
+import heredity
+import inference
+import sampling
+
+# The family of family0.csv
+PEOPLE = {
+    "Harry": {"name": "Harry", "mother": "Lily", "father": "James", "trait": None},
+    "James": {"name": "James", "mother": None, "father": None, "trait": True},
+    "Lily": {"name": "Lily", "mother": None, "father": None, "trait": False},
+}
+
+
+@pytest.mark.parametrize("samples", [1, 10, sampling.BATCHES, sampling.BATCHES + 1])
+def test_likelihood_weighting_with_few_samples(samples):
+    probabilities, errors = sampling.likelihood_weighting(
+        PEOPLE, heredity.PROBS, samples=samples, seed=0
+    )
+    for person in PEOPLE:
+        assert sum(probabilities[person]["gene"].values()) == pytest.approx(1)
+        assert errors[person]["gene"].keys() == {0, 1, 2}
+
+
+@pytest.mark.parametrize("sample", [sampling.likelihood_weighting, sampling.gibbs])
+def test_no_samples(sample):
+    with pytest.raises(ValueError):
+        sample(PEOPLE, heredity.PROBS, samples=0)
+
+
+@pytest.mark.parametrize("sample", [sampling.likelihood_weighting, sampling.gibbs])
+def test_samplers_agree_with_exact_marginals(sample):
+    exact = inference.marginals(PEOPLE, heredity.PROBS)
+    probabilities, errors = sample(PEOPLE, heredity.PROBS, samples=20000, seed=1)
+    for person in PEOPLE:
+        for field in exact[person]:
+            for value, p in exact[person][field].items():
+
+                # The reported half-width is Z standard errors
+                error = errors[person][field][value] / sampling.Z
+                assert abs(probabilities[person][field][value] - p) <= 4 * error + 1e-9
@@ -1,5 +1,10 @@
 import itertools
 
+# Symbols `model_check` evaluates over every model at once; a truth table
+# of n symbols holds 2 ** n bits for each, and any further symbols are
+# enumerated one table at a time
+TABLE_SIZE = 16
+
 
 class Sentence():
 
@@ -7,6 +12,16 @@ class Sentence():
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def bits(self, columns, full):
+        """
+        Evaluates the logical sentence in every model at once. Bit m of
+        each of `columns`, which map symbol names to integers, is the
+        symbol's value in model m, and `full` has a bit set for every
+        model. Returns an integer with bit m set if the sentence is true
+        in model m.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
@@ -62,6 +77,12 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def bits(self, columns, full):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
     def formula(self):
         return self.name
 
@@ -86,6 +107,9 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def bits(self, columns, full):
+        return full ^ self.operand.bits(columns, full)
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
@@ -120,6 +144,12 @@ class And(Sentence):
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def bits(self, columns, full):
+        result = full
+        for conjunct in self.conjuncts:
+            result &= conjunct.bits(columns, full)
+        return result
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
@@ -151,6 +181,12 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def bits(self, columns, full):
+        result = 0
+        for disjunct in self.disjuncts:
+            result |= disjunct.bits(columns, full)
+        return result
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
@@ -183,6 +219,10 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def bits(self, columns, full):
+        return ((full ^ self.antecedent.bits(columns, full))
+                | self.consequent.bits(columns, full))
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
@@ -216,6 +256,9 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def bits(self, columns, full):
+        return full ^ self.left.bits(columns, full) ^ self.right.bits(columns, full)
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
@@ -225,39 +268,45 @@ class Biconditional(Sentence):
         return set.union(self.left.symbols(), self.right.symbols())
 
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
+def truth_table(symbols):
+    """
+    Returns the columns of a truth table over `symbols`, a dictionary
+    mapping each name to an integer whose bit m is the symbol's value in
+    model m, and an integer with a bit set for each of the 2 ** n models.
+    """
+    size = 2 ** len(symbols)
+    full = (1 << size) - 1
+
+    # Symbol i alternates between 2 ** i models where it is false and
+    # 2 ** i where it is true; the first three alternate within a byte
+    patterns = [b"\xaa", b"\xcc", b"\xf0"]
+    columns = {}
+    for i, symbol in enumerate(symbols):
+        if i < len(patterns):
+            block = patterns[i]
         else:
+            block = bytes(2 ** i // 8) + b"\xff" * (2 ** i // 8)
+        repeat = max(1, size // (8 * len(block)))
+        columns[symbol] = int.from_bytes(block * repeat, "little") & full
+    return columns, full
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+def model_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, in every model of up to
+    TABLE_SIZE symbols at once using a truth table.
+    """
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
-
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    inner, outer = symbols[:TABLE_SIZE], symbols[TABLE_SIZE:]
+    columns, full = truth_table(inner)
+
+    # Each remaining symbol is false or true throughout the table
+    for values in itertools.product((0, full), repeat=len(outer)):
+        columns.update(zip(outer, values))
+
+        # Query must be true in every model where knowledge base is true
+        if knowledge.bits(columns, full) & ~query.bits(columns, full):
+            return False
+    return True
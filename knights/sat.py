@@ -0,0 +1,427 @@
+import heapq
+import random
+import sys
+import time
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol, model_check
+
+# Factor by which variable activity grows after every conflict, so recent
+# conflicts count for more when choosing what to decide next
+DECAY = 0.95
+
+# Conflicts before the first restart, and how much longer each next run is
+RESTART = 100
+RESTART_GROWTH = 1.5
+
+# Inhabitants up to this many are also checked with `model_check`
+CHECK_LIMIT = 5
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python sat.py [inhabitants]")
+    count = int(sys.argv[1]) if len(sys.argv) == 2 else 100
+
+    knowledge, symbols = knights_puzzle(count)
+    start = time.perf_counter()
+    solver = Solver()
+    solver.add(knowledge)
+    known = solver.entailed(symbols)
+    seconds = time.perf_counter() - start
+
+    if count <= CHECK_LIMIT:
+        start = time.perf_counter()
+        expected = [symbol for symbol in symbols if model_check(knowledge, symbol)]
+        checked = time.perf_counter() - start
+        if known != expected:
+            sys.exit("Solver differs from model_check.")
+        print(f"model_check: {checked:.3f} s")
+
+    print(f"{count} inhabitants, {len(symbols)} symbols, {len(solver.clauses)} clauses")
+    print(f"Solver: {seconds:.3f} s, {solver.conflicts} conflicts, "
+          f"{solver.decisions} decisions, {solver.propagations} propagations")
+    print(f"Entailed: {len(known)} of {len(symbols)} symbols")
+
+
+def knights_puzzle(count, seed=0):
+    """
+    Return the knowledge of a random knights and knaves puzzle with
+    `count` inhabitants, each making one statement about the others, and
+    the list of symbols it is about. The statements are chosen to be
+    consistent with a hidden answer, so the knowledge is satisfiable.
+    """
+    rng = random.Random(seed)
+    knights = [Symbol(f"{i} is a Knight") for i in range(count)]
+    knaves = [Symbol(f"{i} is a Knave") for i in range(count)]
+    answer = [rng.random() < 0.5 for _ in range(count)]
+    knowledge = And()
+    for i in range(count):
+        knowledge.add(Or(knights[i], knaves[i]))
+        knowledge.add(Not(And(knights[i], knaves[i])))
+
+    for i in range(count):
+        j, k = rng.sample([other for other in range(count) if other != i] or [i, i], 2)
+        statements = [
+            (knaves[j], not answer[j]),
+            (Biconditional(knights[j], knights[k]), answer[j] == answer[k]),
+            (Or(knaves[j], knaves[k]), not answer[j] or not answer[k]),
+            (Implication(knights[j], knaves[k]), not answer[j] or not answer[k]),
+        ]
+        statement, true = rng.choice(statements)
+
+        # A knight only says what is true, and a knave only what is false
+        if answer[i] != true:
+            statement = Not(statement)
+        knowledge.add(Implication(knights[i], statement))
+        knowledge.add(Implication(knaves[i], Not(statement)))
+    return knowledge, [symbol for i in range(count) for symbol in (knights[i], knaves[i])]
+
+
+class Solver():
+    """
+    CDCL satisfiability solver for logical sentences.
+
+    Sentences are turned into clauses by the Tseitin transformation: each
+    And, Or, Implication and Biconditional gets a variable of its own,
+    with clauses making it equal to its operands' combination. Variables
+    are numbered from 1, with literal v meaning variable v is true and
+    -v that it is false.
+
+    Search assigns variables one at a time, propagating unit clauses
+    through two watched literals per clause, and learns a clause from
+    every conflict before jumping back to where it would first have
+    applied.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.watches = {}
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phases = [False]
+        self.heap = []
+        self.increment = 1.0
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.ok = True
+        self.symbols = {}
+        self.gates = {}
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+
+    def variable(self):
+        """Return a new variable."""
+        v = len(self.values)
+        self.values.append(0)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phases.append(False)
+        self.watches[v] = []
+        self.watches[-v] = []
+        heapq.heappush(self.heap, (0.0, v))
+        return v
+
+    def value(self, literal):
+        """Return 1 if `literal` is true, -1 if false and 0 if unassigned."""
+        value = self.values[abs(literal)]
+        return value if literal > 0 else -value
+
+    def literal(self, sentence):
+        """
+        Return a literal that is true exactly when `sentence` is, adding
+        the clauses that define it the first time a sentence is seen.
+        """
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.symbols:
+                self.symbols[sentence.name] = self.variable()
+            return self.symbols[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.gates:
+            return self.gates[sentence]
+
+        if isinstance(sentence, And):
+            literal = self.conjunction([self.literal(c) for c in sentence.conjuncts])
+        elif isinstance(sentence, Or):
+            literal = -self.conjunction([-self.literal(d) for d in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            literal = -self.conjunction([
+                self.literal(sentence.antecedent), -self.literal(sentence.consequent)
+            ])
+        elif isinstance(sentence, Biconditional):
+            left = self.literal(sentence.left)
+            right = self.literal(sentence.right)
+            literal = self.variable()
+            self.clause([-literal, -left, right])
+            self.clause([-literal, left, -right])
+            self.clause([literal, left, right])
+            self.clause([literal, -left, -right])
+        else:
+            raise TypeError("must be a logical sentence")
+        self.gates[sentence] = literal
+        return literal
+
+    def conjunction(self, literals):
+        """Return a new variable that is true exactly when all `literals` are."""
+        v = self.variable()
+        for literal in literals:
+            self.clause([-v, literal])
+        self.clause([v] + [-literal for literal in literals])
+        return v
+
+    def add(self, sentence):
+        """Assert that `sentence` is true."""
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clause([self.literal(disjunct) for disjunct in sentence.disjuncts])
+        else:
+            self.clause([self.literal(sentence)])
+
+    def clause(self, literals):
+        """
+        Add a clause that at least one of `literals` is true. Clauses are
+        only added between searches, when nothing but what is certain has
+        been assigned.
+        """
+        if not self.ok:
+            return
+        clause = []
+        for literal in literals:
+            value = self.value(literal)
+            if value == 1 or -literal in clause:
+                return
+            if value == 0 and literal not in clause:
+                clause.append(literal)
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            self.ok = self.propagate() is None
+        else:
+            self.watch(clause)
+
+    def watch(self, clause):
+        """Store `clause`, watching its first two literals. Returns its index."""
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def assign(self, literal, reason):
+        """Make `literal` true, implied by clause `reason` or decided if None."""
+        v = abs(literal)
+        self.values[v] = 1 if literal > 0 else -1
+        self.levels[v] = len(self.limits)
+        self.reasons[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assign every literal left alone in a clause whose other literals
+        are false. Returns the index of a clause made false, or None.
+        """
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            watching = self.watches[false]
+            kept = []
+            for position, index in enumerate(watching):
+                clause = self.clauses[index]
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], clause[0]
+                first = clause[0]
+                if self.value(first) == 1:
+                    kept.append(index)
+                    continue
+
+                # Look for another literal that is not false to watch instead
+                for other in range(2, len(clause)):
+                    if self.value(clause[other]) != -1:
+                        clause[1], clause[other] = clause[other], clause[1]
+                        self.watches[clause[1]].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if self.value(first) == -1:
+                        kept.extend(watching[position + 1:])
+                        self.watches[false] = kept
+                        self.head = len(self.trail)
+                        return index
+                    self.assign(first, index)
+                    self.propagations += 1
+            self.watches[false] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Return a clause learned from the clause `conflict` made false, with
+        one literal from the current level first, and the level to jump
+        back to, where that literal would have been implied.
+        """
+        level = len(self.limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        clause = self.clauses[conflict]
+        position = len(self.trail) - 1
+        literal = None
+        while True:
+            for other in (clause if literal is None else clause[1:]):
+                v = abs(other)
+                if v not in seen and self.levels[v] > 0:
+                    seen.add(v)
+                    self.bump(v)
+                    if self.levels[v] == level:
+                        pending += 1
+                    else:
+                        learned.append(other)
+
+            # Resolve with the reason of the latest literal involved, until
+            # one literal of the current level is left
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            pending -= 1
+            if not pending:
+                break
+            clause = self.clauses[self.reasons[abs(literal)]]
+        learned[0] = -literal
+
+        if len(learned) == 1:
+            return learned, 0
+        deepest = max(range(1, len(learned)), key=lambda i: self.levels[abs(learned[i])])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, self.levels[abs(learned[1])]
+
+    def bump(self, v):
+        """Raise the activity of variable `v`, rescaling all if it grows too large."""
+        self.activity[v] += self.increment
+        if self.activity[v] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[u], u) for u in range(1, len(self.values)) if not self.values[u]]
+            heapq.heapify(self.heap)
+        if not self.values[v]:
+            heapq.heappush(self.heap, (-self.activity[v], v))
+
+    def backtrack(self, level):
+        """Undo every assignment made after decision level `level`."""
+        if len(self.limits) <= level:
+            return
+        for literal in self.trail[self.limits[level]:]:
+            v = abs(literal)
+            self.phases[v] = literal > 0
+            self.values[v] = 0
+            self.reasons[v] = None
+            heapq.heappush(self.heap, (-self.activity[v], v))
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """Return the most active unassigned variable, or None if there is none."""
+        while self.heap:
+            _, v = heapq.heappop(self.heap)
+            if not self.values[v]:
+                return v
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Return a model of everything added so far in which every literal
+        of `assumptions` is true, as a dictionary mapping each symbol's
+        name to its value, or None if there is no such model.
+        """
+        if not self.ok:
+            return None
+        restart = RESTART
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                conflicts += 1
+                if not self.limits:
+                    self.ok = False
+                    return None
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.assign(learned[0], self.watch(learned))
+                self.increment /= DECAY
+                if conflicts >= restart:
+                    conflicts = 0
+                    restart *= RESTART_GROWTH
+                    self.backtrack(0)
+                continue
+
+            # Assumptions are decided first, one to a level
+            level = len(self.limits)
+            if level < len(assumptions):
+                literal = assumptions[level]
+                if self.value(literal) == 1:
+                    self.limits.append(len(self.trail))
+                    continue
+                if self.value(literal) == -1:
+                    self.backtrack(0)
+                    return None
+            else:
+                v = self.decide()
+                if v is None:
+                    model = {name: self.values[v] == 1 for name, v in self.symbols.items()}
+                    self.backtrack(0)
+                    return model
+                literal = v if self.phases[v] else -v
+            self.decisions += 1
+            self.limits.append(len(self.trail))
+            self.assign(literal, None)
+
+    def entails(self, query):
+        """Return whether everything added so far entails `query`."""
+        return self.solve([-self.literal(query)]) is None
+
+    def entailed(self, symbols):
+        """
+        Return the list of `symbols` that everything added so far entails.
+        A symbol false in any model found along the way cannot be entailed,
+        so each model rules out the rest of its false symbols at once.
+        """
+        model = self.solve()
+        if model is None:
+            return list(symbols)
+        candidates = {symbol for symbol in symbols if model.get(symbol.name, False)}
+        result = []
+        for symbol in symbols:
+            if symbol not in candidates:
+                continue
+            model = self.solve([-self.literal(symbol)])
+            if model is None:
+                result.append(symbol)
+            else:
+                candidates -= {other for other in candidates if not model.get(other.name, False)}
+        return result
+
+
+def entails(knowledge, query):
+    """
+    Return whether `knowledge` entails `query`, as `model_check` does,
+    by checking that `knowledge` and not `query` cannot both be true.
+    """
+    solver = Solver()
+    solver.add(knowledge)
+    return solver.entails(query)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import csv
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import crawler
+import matrix
+import sampling
+
+DAMPING = 0.85
+
+# Smallest graph benchmarked; each next one is ten times larger
+SMALLEST = 1000
+
+# Largest graph benchmarked unless --max is given
+LARGEST = 1000000
+
+# Power-law exponent of both the out-degree and in-degree distributions
+EXPONENT = 2.1
+
+# Fraction of pages with no links at all
+DANGLING = 0.05
+
+# Graphs up to this many pages are also written out as HTML and crawled
+CRAWL_LIMIT = 100000
+
+# Samples drawn per page, up to MAX_SAMPLES in all
+SAMPLES_PER_PAGE = 20
+MAX_SAMPLES = 10000000
+
+FIELDS = [
+    "nodes", "links", "generate_s", "crawl_s", "build_s", "iterate_s",
+    "iterations", "residual", "sample_s", "samples_per_s", "sample_l1_error",
+]
+
+
+def main():
+    args = sys.argv[1:]
+    largest = LARGEST
+    for arg in [arg for arg in args if arg.startswith("--max=")]:
+        largest = int(arg.split("=", 1)[1])
+        args.remove(arg)
+    seed = 0
+    for arg in [arg for arg in args if arg.startswith("--seed=")]:
+        seed = int(arg.split("=", 1)[1])
+        args.remove(arg)
+    if args:
+        sys.exit("Usage: python benchmark.py [--max=N] [--seed=S]")
+
+    writer = csv.DictWriter(sys.stdout, FIELDS)
+    writer.writeheader()
+    nodes = SMALLEST
+    while nodes <= largest:
+        writer.writerow(benchmark(nodes, seed))
+        sys.stdout.flush()
+        nodes *= 10
+
+
+def powerlaw_graph(nodes, exponent=EXPONENT, dangling=DANGLING, seed=0):
+    """
+    Return (sources, targets) arrays of the links of a random graph on
+    `nodes` pages whose out-degrees and in-degrees both follow power laws
+    with `exponent`, and where a `dangling` fraction of pages has no links.
+    Self-links are left out; a page may link to another more than once.
+    """
+    rng = np.random.default_rng(seed)
+    degrees = np.minimum(rng.zipf(exponent, nodes), nodes - 1)
+    degrees[rng.random(nodes) < dangling] = 0
+    sources = np.repeat(np.arange(nodes, dtype=np.int64), degrees)
+
+    # Target popularity falls off with rank r as r ** -alpha, which gives
+    # in-degrees the same exponent; ranks are shuffled across pages
+    alpha = 1 / (exponent - 1)
+    scale = nodes ** (1 - alpha)
+    ranks = (rng.random(len(sources)) * scale) ** (1 / (1 - alpha))
+    targets = rng.permutation(nodes)[np.minimum(ranks.astype(np.int64), nodes - 1)]
+
+    keep = sources != targets
+    return sources[keep], targets[keep]
+
+
+def write_corpus(directory, nodes, sources, targets):
+    """Write the links as a corpus of HTML pages named 0.html, 1.html, ..."""
+    order = np.argsort(sources, kind="stable")
+    offsets = np.searchsorted(sources[order], np.arange(nodes + 1))
+    targets = targets[order]
+    for page in range(nodes):
+        links = targets[offsets[page]:offsets[page + 1]].tolist()
+        with open(os.path.join(directory, f"{page}.html"), "w") as f:
+            f.write("<html><body>\n")
+            for link in links:
+                f.write(f'<a href="{link}.html">{link}</a>\n')
+            f.write("</body></html>\n")
+
+
+def benchmark(nodes, seed=0):
+    """
+    Time each phase of ranking a generated power-law graph of `nodes`
+    pages, returning a row with the FIELDS above.
+    """
+    row = {"nodes": nodes}
+    start = time.perf_counter()
+    sources, targets = powerlaw_graph(nodes, seed=seed)
+    row["generate_s"] = time.perf_counter() - start
+    row["links"] = len(sources)
+
+    row["crawl_s"] = ""
+    if nodes <= CRAWL_LIMIT:
+        with tempfile.TemporaryDirectory() as directory:
+            write_corpus(directory, nodes, sources, targets)
+            start = time.perf_counter()
+            crawler.crawl(directory)
+            row["crawl_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    transitions, dangling = matrix.transition_matrix(nodes, sources, targets)
+    row["build_s"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    residuals = []
+    ranks, row["iterations"] = matrix.power_iteration(
+        transitions, dangling, DAMPING, history=residuals
+    )
+    row["iterate_s"] = time.perf_counter() - start
+    row["residual"] = residuals[-1]
+
+    # Sample on the same links, laid out the way sampling.link_table does
+    order = np.argsort(sources, kind="stable")
+    offsets = np.searchsorted(sources[order], np.arange(nodes + 1))
+    samples = min(MAX_SAMPLES, SAMPLES_PER_PAGE * nodes)
+    start = time.perf_counter()
+    counts = sampling.walk(offsets, targets[order], DAMPING, samples, seed=seed)
+    row["sample_s"] = time.perf_counter() - start
+    row["samples_per_s"] = samples / row["sample_s"]
+    row["sample_l1_error"] = float(np.abs(counts / samples - ranks).sum())
+    return row
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import multiprocessing
+import os
+import re
+import sys
+import time
+
+# Same pattern `pagerank.crawl` searches each page for
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Characters read from a page at a time; a link tag longer than this
+# may be missed if it straddles two reads
+CHUNK = 1 << 20
+
+# Number of files each worker process is handed at once
+BATCH = 512
+
+
+def main():
+    args = sys.argv[1:]
+    processes = os.cpu_count()
+    for arg in [arg for arg in args if arg.startswith("--processes=")]:
+        processes = int(arg.split("=", 1)[1])
+        args.remove(arg)
+    if len(args) != 1:
+        sys.exit("Usage: python crawler.py [--processes=N] corpus")
+    directory = args[0]
+
+    # Imported here, as pagerank.py uses this module for its own crawl
+    import pagerank
+
+    start = time.perf_counter()
+    expected = pagerank.crawl(directory)
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    pages = crawl(directory, processes)
+    parallel = time.perf_counter() - start
+
+    if pages != expected:
+        sys.exit("Parallel crawl differs from pagerank.crawl.")
+    links = sum(len(links) for links in pages.values())
+    print(f"Crawled {len(pages)} pages with {links} links")
+    print(f"pagerank.crawl: {serial:.2f} s")
+    print(f"crawler.crawl on {processes} processes: {parallel:.2f} s "
+          f"({serial / parallel:.1f}x)")
+
+
+def extract_links(path):
+    """
+    Return the set of link targets found in the HTML file at `path`,
+    reading it a chunk at a time so it need not fit in memory.
+    """
+    links = set()
+    with open(path) as f:
+        if os.fstat(f.fileno()).st_size <= CHUNK:
+            return set(LINK.findall(f.read()))
+        buffer = ""
+        while True:
+            chunk = f.read(CHUNK)
+            buffer += chunk
+            if len(chunk) < CHUNK:
+                links.update(LINK.findall(buffer))
+                return links
+            end = 0
+            for match in LINK.finditer(buffer):
+                links.add(match.group(1))
+                end = match.end()
+
+            # Keep the unmatched tail, in case a link is cut off by the read
+            buffer = buffer[max(end, len(buffer) - CHUNK):]
+
+
+def extract_batch(directory, filenames):
+    """
+    Return a list of (filename, links) pairs for `filenames` in
+    `directory`, leaving out each page's links to itself.
+    """
+    return [
+        (filename, extract_links(os.path.join(directory, filename)) - {filename})
+        for filename in filenames
+    ]
+
+
+def extract_star(args):
+    """Unpacks a (directory, filenames) task for `Pool.imap_unordered`."""
+    return extract_batch(*args)
+
+
+def extract_all(directory, filenames, processes=None):
+    """
+    Yield (filename, links) pairs for `filenames` in `directory`, as
+    worker processes finish extracting them in batches of BATCH files.
+    """
+    tasks = [
+        (directory, filenames[i:i + BATCH])
+        for i in range(0, len(filenames), BATCH)
+    ]
+    if processes == 1 or len(tasks) <= 1:
+        for task in tasks:
+            yield from extract_star(task)
+        return
+    with multiprocessing.Pool(processes) as pool:
+        for batch in pool.imap_unordered(extract_star, tasks):
+            yield from batch
+
+
+def crawl(directory, processes=None):
+    """
+    Return the same dictionary as `pagerank.crawl`, mapping each page in
+    `directory` to the set of other pages in the corpus it links to.
+
+    Files are handed to `processes` worker processes in batches, and
+    the link map is filled in as their results come back.
+    """
+    filenames = sorted(
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".html")
+    )
+    pages = dict(extract_all(directory, filenames, processes))
+
+    # Only include links to other pages in the corpus
+    for filename in pages:
+        pages[filename] = set(
+            link for link in pages[filename]
+            if link in pages
+        )
+    return pages
+
+
+if __name__ == "__main__":
+    main()
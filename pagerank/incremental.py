@@ -0,0 +1,201 @@
+import numpy as np
+
+import matrix
+
+# Links of changed pages kept beside the sparse matrix, as a fraction of
+# all pages, before the matrix is rebuilt to include them
+REBUILD = 0.05
+
+
+class IncrementalPageRank():
+    """
+    PageRank values of a corpus that are kept up to date as its pages
+    gain or lose links, without iterating from scratch.
+
+    Alongside the ranks `x`, the residual `r = (1 - d) / n + d * P x - x`
+    is maintained, where P follows a random link and treats a dangling
+    page as linking to every page. Converged ranks have a residual near
+    zero. A change of links only disturbs the residual around the pages
+    that changed, and `update` pushes it away from there, Gauss-Southwell
+    style, until it is below tolerance again.
+
+    The residual is the difference between two successive power
+    iterations, so stopping when its norm is below `tolerance` gives
+    the same error bound as `matrix.power_iteration`.
+    """
+
+    def __init__(self, corpus, damping_factor, tolerance=matrix.TOLERANCE,
+                 norm=1):
+        self.damping_factor = damping_factor
+        self.tolerance = tolerance
+        self.norm = norm
+        self.pages, self.index = matrix.index_pages(corpus)
+        self.links = {
+            self.index[page]: {self.index[link] for link in links}
+            for page, links in corpus.items()
+        }
+        self.rebuild()
+        self.x, _ = matrix.power_iteration(
+            self.matrix, self.dangling, damping_factor, tolerance, norm
+        )
+        self.r = self.residual()
+        self.pushes = 0
+
+    def rebuild(self):
+        """
+        Rebuilds the sparse matrix from the current links, so no page
+        needs its links looked up one at a time.
+        """
+        n = len(self.pages)
+        sources = np.fromiter(
+            (page for page in range(n) for _ in self.links[page]), dtype=np.int64
+        )
+        targets = np.fromiter(
+            (link for page in range(n) for link in self.links[page]), dtype=np.int64
+        )
+        matrix_, self.dangling = matrix.transition_matrix(n, sources, targets)
+        self.matrix = matrix_.tocsc()
+        self.changed = np.zeros(n, dtype=bool)
+
+    def residual(self):
+        """Returns the residual of the ranks, computed from scratch."""
+        d = self.damping_factor
+        n = len(self.pages)
+        spread = (1 - d + d * self.x[self.dangling].sum()) / n
+        return d * (self.matrix @ self.x) + spread - self.x
+
+    def ranks(self):
+        """
+        Returns PageRank values for each page as a dictionary
+        like `pagerank.iterate_pagerank` returns.
+        """
+        return dict(zip(self.pages, (self.x / self.x.sum()).tolist()))
+
+    def update(self, added=None, removed=None):
+        """
+        Updates the ranks after the links in `added`, a dictionary mapping
+        pages to sets of pages they now link to, were added and those in
+        `removed` were taken away. Pages new to the corpus may appear in
+        `added`, with or without links; pages are never deleted. Pages and
+        links in `removed` that are not in the corpus have nothing to
+        remove, and are skipped.
+
+        Returns the number of times a page's residual was pushed.
+        """
+        added = added or {}
+        removed = removed or {}
+        self.add_pages(sorted(
+            set(added).union(*added.values()) - set(self.index)
+        ))
+        for page in set(added) | (set(removed) & set(self.index)):
+            u = self.index[page]
+            links = self.links[u]
+            old = set(links)
+            links |= {self.index[link] for link in added.get(page, ())}
+            links -= {
+                self.index[link] for link in removed.get(page, ()) if link in self.index
+            }
+            if links != old:
+                self.relink(u, old, links)
+
+        pushes = self.push()
+        if self.changed.sum() > REBUILD * len(self.pages):
+            self.rebuild()
+        return pushes
+
+    def add_pages(self, pages):
+        """
+        Appends `pages`, with no links yet and zero rank, adjusting the
+        residual of every page for the larger corpus.
+        """
+        if not pages:
+            return
+        d = self.damping_factor
+        n = len(self.pages)
+        for page in pages:
+            self.index[page] = len(self.pages)
+            self.links[len(self.pages)] = set()
+            self.pages.append(page)
+        m = len(self.pages)
+
+        # The teleport and dangling terms are now shared among m pages
+        uniform = 1 - d + d * self.x[self.dangling].sum()
+        self.r += uniform / m - uniform / n
+        self.x = np.concatenate((self.x, np.zeros(m - n)))
+        self.r = np.concatenate((self.r, np.full(m - n, uniform / m)))
+        self.dangling = np.concatenate((self.dangling, np.ones(m - n, dtype=bool)))
+        self.changed = np.concatenate((self.changed, np.ones(m - n, dtype=bool)))
+
+    def relink(self, u, old, new):
+        """
+        Adjusts the residual for page `u` linking to the pages in `new`
+        instead of those in `old`, and marks its links as changed.
+        """
+        d = self.damping_factor
+        self.spread(u, old, -d * self.x[u])
+        self.spread(u, new, d * self.x[u])
+        self.dangling[u] = not new
+        self.changed[u] = True
+
+    def spread(self, u, links, amount):
+        """Adds `amount` to the residual, shared among `links` or every page."""
+        if links:
+            for v in links:
+                self.r[v] += amount / len(links)
+        else:
+            self.r += amount / len(self.pages)
+
+    def push(self):
+        """
+        Moves residual into the ranks until its norm is below tolerance.
+        Each round pushes every page whose residual is large enough that,
+        were all pages like it, the norm would still be above tolerance.
+        Returns the number of pages pushed.
+        """
+        d = self.damping_factor
+        n = len(self.pages)
+        threshold = self.tolerance / n ** (1 / self.norm)
+        pushes = 0
+        while np.linalg.norm(self.r, ord=self.norm) >= self.tolerance:
+            active = np.flatnonzero(np.abs(self.r) >= threshold)
+            amounts = self.r[active]
+            self.x[active] += amounts
+            self.r[active] = 0
+            pushes += len(active)
+
+            # Pages whose links changed since the matrix was built are
+            # pushed one link at a time; the rest through the matrix
+            changed = self.changed[active]
+            base = ~changed & (active < self.matrix.shape[1])
+            if base.any():
+                pushed = self.matrix[:, active[base]] @ amounts[base]
+                self.r[:len(pushed)] += d * pushed
+            for u, amount in zip(active[changed].tolist(), amounts[changed].tolist()):
+                if self.links[u]:
+                    self.spread(u, self.links[u], d * amount)
+            dangling = self.dangling[active]
+            if dangling.any():
+                self.r += d * amounts[dangling].sum() / n
+        self.pushes += pushes
+        return pushes
+
+
+def link_diff(old, new):
+    """
+    Returns (added, removed) dictionaries of the links that differ between
+    two corpora shaped like `pagerank.crawl` returns, for
+    `IncrementalPageRank.update`. Pages missing from `new` lose their
+    links, but stay in the ranking.
+    """
+    added = {}
+    removed = {}
+    for page, links in new.items():
+        before = old.get(page, set())
+        if links - before or page not in old:
+            added[page] = links - before
+        if before - links:
+            removed[page] = before - links
+    for page in old.keys() - new.keys():
+        if old[page]:
+            removed[page] = set(old[page])
+    return added, removed
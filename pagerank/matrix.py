@@ -0,0 +1,153 @@
+import numpy as np
+import scipy.sparse
+
+# Largest change in PageRank values between iterations, measured in
+# the norm passed to `power_iteration`, that counts as converged
+TOLERANCE = 1e-10
+
+# Iterations after which `power_iteration` gives up converging
+MAX_ITERATIONS = 1000
+
+
+def index_pages(corpus):
+    """
+    Return a sorted list of the pages in `corpus`, and a dictionary
+    mapping each page to its position in that list.
+    """
+    pages = sorted(corpus)
+    return pages, {page: i for i, page in enumerate(pages)}
+
+
+def link_arrays(corpus, pages, index):
+    """
+    Return (sources, targets) arrays of the links in `corpus`, with
+    `pages` numbered by `index`. Every link must be to a page in
+    `corpus`, as `crawl` guarantees.
+    """
+    counts = np.fromiter(
+        (len(corpus[page]) for page in pages), dtype=np.int64, count=len(pages)
+    )
+    targets = np.fromiter(
+        (index[link] for page in pages for link in corpus[page]),
+        dtype=np.int64, count=int(counts.sum())
+    )
+    sources = np.repeat(np.arange(len(pages), dtype=np.int64), counts)
+    return sources, targets
+
+
+def transition_matrix(n, sources, targets):
+    """
+    Return the transition matrix of a surfer following a random link, for
+    `n` pages and links `sources[k] -> targets[k]`, as a CSR matrix whose
+    entry [j, i] is the probability of moving from page i to page j.
+
+    Also return a boolean array marking the dangling pages, which have
+    no links and so empty columns.
+    """
+    sources = np.asarray(sources, dtype=np.int64)
+    targets = np.asarray(targets, dtype=np.int64)
+    outdegree = np.bincount(sources, minlength=n)
+    weights = 1 / outdegree[sources]
+    matrix = scipy.sparse.csr_matrix(
+        (weights, (targets, sources)), shape=(n, n), dtype=np.float64
+    )
+    return matrix, outdegree == 0
+
+
+def power_iteration(matrix, dangling, damping_factor, tolerance=TOLERANCE,
+                    norm=1, max_iterations=MAX_ITERATIONS, start=None,
+                    history=None):
+    """
+    Return PageRank values for the pages of a `transition_matrix` by
+    power iteration, and the number of iterations it took.
+
+    A dangling page is treated as linking to every page, so its rank is
+    spread evenly. Iteration stops once the change in the rank vector,
+    measured in `norm` (1, 2 or np.inf), is below `tolerance`.
+    Iteration starts from `start` if given, or the uniform distribution.
+    If `history` is a list, the change after each iteration is appended.
+    """
+    n = matrix.shape[0]
+    if start is None:
+        ranks = np.full(n, 1 / n)
+    else:
+        ranks = np.asarray(start, dtype=np.float64) / np.sum(start)
+
+    for iteration in range(1, max_iterations + 1):
+        spread = damping_factor * ranks[dangling].sum() + 1 - damping_factor
+        updated = damping_factor * (matrix @ ranks) + spread / n
+        change = np.linalg.norm(updated - ranks, ord=norm)
+        ranks = updated
+        if history is not None:
+            history.append(float(change))
+        if change < tolerance:
+            break
+    return ranks / ranks.sum(), iteration
+
+
+def block_power_iteration(matrix, dangling, damping_factor, teleports,
+                          tolerance=TOLERANCE, norm=1,
+                          max_iterations=MAX_ITERATIONS, history=None):
+    """
+    Return personalized PageRank values for each column of `teleports`,
+    an n by k array of teleport distributions over the pages of a
+    `transition_matrix`, and the number of iterations it took.
+
+    All k rank vectors are iterated together as one dense block, so each
+    iteration reads the sparse matrix once rather than k times. A surfer
+    who teleports, or leaves a dangling page, jumps according to its own
+    column. Iteration stops once every column changes by less than
+    `tolerance` in `norm`. If `history` is a list, the largest change
+    of any column after each iteration is appended.
+    """
+    teleports = np.asarray(teleports, dtype=np.float64)
+    teleports = teleports / teleports.sum(axis=0)
+    ranks = teleports.copy()
+    dangling = dangling.astype(np.float64)
+
+    # Blocks are large, so the same buffers are reused every iteration
+    updated = np.empty_like(ranks)
+    change = np.empty_like(ranks)
+
+    for iteration in range(1, max_iterations + 1):
+        spread = damping_factor * (dangling @ ranks) + 1 - damping_factor
+        np.multiply(matrix @ ranks, damping_factor, out=updated)
+        np.multiply(teleports, spread, out=change)
+        updated += change
+        np.subtract(updated, ranks, out=change)
+        ranks, updated = updated, ranks
+        largest = float(column_norms(change, norm).max())
+        if history is not None:
+            history.append(largest)
+        if largest < tolerance:
+            break
+    return ranks / ranks.sum(axis=0), iteration
+
+
+def column_norms(block, norm):
+    """
+    Return the `norm` of each column of `block`, overwriting
+    `block` with its absolute values along the way.
+    """
+    np.abs(block, out=block)
+    if norm == 1:
+        return block.sum(axis=0)
+    if norm == np.inf:
+        return block.max(axis=0)
+    np.power(block, norm, out=block)
+    return block.sum(axis=0) ** (1 / norm)
+
+
+def pagerank(corpus, damping_factor, tolerance=TOLERANCE, norm=1,
+             max_iterations=MAX_ITERATIONS):
+    """
+    Return PageRank values for each page of `corpus` by sparse power
+    iteration, as a dictionary like `iterate_pagerank` returns, and the
+    number of iterations it took.
+    """
+    pages, index = index_pages(corpus)
+    matrix, dangling = transition_matrix(len(pages), *link_arrays(corpus, pages, index))
+    ranks, iterations = power_iteration(
+        matrix, dangling, damping_factor, tolerance, norm, max_iterations
+    )
+    return dict(zip(pages, ranks.tolist())), iterations
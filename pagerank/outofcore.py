@@ -0,0 +1,303 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import crawler
+import matrix
+
+DAMPING = 0.85
+
+# Destination pages whose incoming links share one partition file
+PARTITION = 1 << 20
+
+# Links held in memory before they are spilled to the partition files,
+# and read back at a time when iterating
+BUFFER = 1 << 22
+
+# Most sorted runs of links merged into one at a time
+FAN_IN = 64
+
+# Each link is stored on disk as a (source, target) pair of page numbers
+EDGE = np.dtype([("source", "<i4"), ("target", "<i4")])
+
+# Page names, NUL-separated, written into the work directory
+PAGES = "pages"
+
+
+def main():
+    args = sys.argv[1:]
+    workdir = None
+    for arg in [arg for arg in args if arg.startswith("--workdir=")]:
+        workdir = arg.split("=", 1)[1]
+        args.remove(arg)
+    if len(args) != 1:
+        sys.exit("Usage: python outofcore.py [--workdir=DIR] corpus")
+
+    start = time.perf_counter()
+    edges = partition(args[0], workdir)
+    print(f"Partitioned {edges.links} links between {edges.pages} pages "
+          f"into {len(edges.partitions)} files in {time.perf_counter() - start:.2f} s")
+
+    residuals = []
+    traffic = []
+    start = time.perf_counter()
+    ranks, iterations = power_iteration(
+        edges, DAMPING, history=residuals, traffic=traffic
+    )
+    print(f"PageRank Results from Out-of-Core Iteration ({iterations} iterations, "
+          f"{time.perf_counter() - start:.2f} s)")
+    for i, (residual, read) in enumerate(zip(residuals, traffic), 1):
+        print(f"  iteration {i}: residual {residual:.3e}, read {read / 2 ** 20:.1f} MiB")
+    for page, rank in zip(edges.names(), ranks.tolist()):
+        print(f"  {page}: {rank:.4f}")
+    if workdir is None:
+        edges.remove()
+
+
+class PartitionedEdges():
+    """
+    Links of a corpus kept on disk in a work directory, split into files
+    by the page they lead to and sorted within each file by that page.
+
+    Partition k holds the links to pages `partitions[k][0]` up to but not
+    including `partitions[k][1]`. Only the out-degree of each page is
+    kept in memory; page names are read back from disk when asked for.
+    """
+
+    def __init__(self, workdir, pages, links, partitions, outdegree):
+        self.workdir = workdir
+        self.pages = pages
+        self.links = links
+        self.partitions = partitions
+        self.outdegree = outdegree
+
+    def path(self, k):
+        """Return the path of partition file k."""
+        return os.path.join(self.workdir, f"partition-{k:05}.edges")
+
+    def names(self):
+        """Return the list of page names, in page number order."""
+        with open(os.path.join(self.workdir, PAGES), "rb") as f:
+            names = f.read().decode("utf-8")
+        return names.split("\0") if names else []
+
+    def stream(self, k):
+        """
+        Yield arrays of EDGE pairs from partition file k, at most BUFFER
+        links at a time, along with the number of bytes each took to read.
+        """
+        with open(self.path(k), "rb") as f:
+            while True:
+                chunk = np.fromfile(f, dtype=EDGE, count=BUFFER)
+                if not len(chunk):
+                    return
+                yield chunk, chunk.nbytes
+
+    def remove(self):
+        """Delete the work directory and everything in it."""
+        shutil.rmtree(self.workdir, ignore_errors=True)
+
+
+def partition(directory, workdir=None, processes=None, size=PARTITION):
+    """
+    Crawl the HTML pages of `directory` into a PartitionedEdges in
+    `workdir`, a new temporary directory if not given, with `size`
+    destination pages to a partition.
+
+    Pages are numbered in sorted order. Links are spilled to disk every
+    BUFFER links as pages are crawled, so the link map never has to fit
+    in memory; only the page names do, while crawling.
+    """
+    if workdir is None:
+        workdir = tempfile.mkdtemp(prefix="pagerank-")
+    os.makedirs(workdir, exist_ok=True)
+
+    filenames = sorted(
+        filename for filename in os.listdir(directory)
+        if filename.endswith(".html")
+    )
+    n = len(filenames)
+    index = {filename: i for i, filename in enumerate(filenames)}
+    with open(os.path.join(workdir, PAGES), "wb") as f:
+        f.write("\0".join(filenames).encode("utf-8"))
+    partitions = [(lo, min(lo + size, n)) for lo in range(0, n, size)]
+    edges = PartitionedEdges(workdir, n, 0, partitions, np.zeros(n, dtype=np.int64))
+    for k in range(len(partitions)):
+        open(edges.path(k), "wb").close()
+
+    # Spill links to the partition of their target whenever enough are held
+    buffer = []
+    held = 0
+    for filename, links in crawler.extract_all(directory, filenames, processes):
+        targets = [index[link] for link in links if link in index]
+        source = index[filename]
+        edges.outdegree[source] = len(targets)
+        if targets:
+            chunk = np.empty(len(targets), dtype=EDGE)
+            chunk["source"] = source
+            chunk["target"] = targets
+            buffer.append(chunk)
+            held += len(targets)
+        if held >= BUFFER:
+            spill(edges, buffer, size)
+            buffer, held = [], 0
+    spill(edges, buffer, size)
+    del index
+
+    # Sort each partition by target, so each iteration adds up the
+    # rank flowing into a page from consecutive links
+    for k in range(len(partitions)):
+        sort_partition(edges.path(k))
+
+    edges.links = int(edges.outdegree.sum())
+    return edges
+
+
+def spill(edges, buffer, size):
+    """Append the EDGE arrays in `buffer` to the partitions of their targets."""
+    if not buffer:
+        return
+    links = np.concatenate(buffer)
+    parts = links["target"] // size
+    order = np.argsort(parts, kind="stable")
+    links = links[order]
+    bounds = np.searchsorted(parts[order], np.arange(len(edges.partitions) + 1))
+    for k in range(len(edges.partitions)):
+        if bounds[k] < bounds[k + 1]:
+            with open(edges.path(k), "ab") as f:
+                links[bounds[k]:bounds[k + 1]].tofile(f)
+
+
+def sort_partition(path):
+    """
+    Sort the EDGE pairs in the file at `path` by target, holding at most
+    BUFFER links in memory: runs of BUFFER links are sorted into files of
+    their own, which are then merged FAN_IN at a time until one is left.
+    """
+    runs = []
+    with open(path, "rb") as f:
+        while True:
+            links = np.fromfile(f, dtype=EDGE, count=BUFFER)
+            if not len(links):
+                break
+            runs.append(f"{path}.run{len(runs)}")
+            links[np.argsort(links["target"], kind="stable")].tofile(runs[-1])
+    while len(runs) > 1:
+        merged = []
+        for i in range(0, len(runs), FAN_IN):
+            merged.append(f"{path}.run{i // FAN_IN}.merged")
+            merge_runs(runs[i:i + FAN_IN], merged[-1])
+            for run in runs[i:i + FAN_IN]:
+                os.remove(run)
+        runs = [f"{path}.run{k}" for k in range(len(merged))]
+        for run, name in zip(merged, runs):
+            os.replace(run, name)
+    if runs:
+        os.replace(runs[0], path)
+
+
+def merge_runs(runs, path):
+    """
+    Merge the files of EDGE pairs at `runs`, each sorted by target, into
+    one sorted file at `path`, reading BUFFER links in all at a time.
+    """
+    block = max(1, BUFFER // len(runs))
+    files = [open(run, "rb") for run in runs]
+    buffers = [np.empty(0, dtype=EDGE) for _ in runs]
+    done = [False] * len(runs)
+    try:
+        with open(path, "wb") as out:
+            while True:
+                for i, f in enumerate(files):
+                    if not len(buffers[i]) and not done[i]:
+                        buffers[i] = np.fromfile(f, dtype=EDGE, count=block)
+                        done[i] = len(buffers[i]) < block
+                if not any(len(buffer) for buffer in buffers):
+                    return
+
+                # Every link up to the smallest last target of a run with
+                # more left to read is already in memory, so can be written
+                pending = [buffer["target"][-1] for buffer, d in zip(buffers, done) if not d]
+                cutoff = min(pending) if pending else np.iinfo(np.int32).max
+                ready = []
+                for i, buffer in enumerate(buffers):
+                    split = np.searchsorted(buffer["target"], cutoff, side="right")
+                    ready.append(buffer[:split])
+                    buffers[i] = buffer[split:]
+                links = np.concatenate(ready)
+                links[np.argsort(links["target"], kind="stable")].tofile(out)
+    finally:
+        for f in files:
+            f.close()
+
+
+def power_iteration(edges, damping_factor, tolerance=matrix.TOLERANCE, norm=1,
+                    max_iterations=matrix.MAX_ITERATIONS, history=None,
+                    traffic=None):
+    """
+    Return PageRank values for the pages of a PartitionedEdges, computed
+    as `matrix.power_iteration` does, and the number of iterations it took.
+
+    Each iteration reads every partition file once, from start to end,
+    and holds only the rank vectors and one buffer of links in memory.
+    If `history` is a list, the change after each iteration is appended;
+    if `traffic` is a list, the bytes read during each iteration are.
+    """
+    n = edges.pages
+    linked = edges.outdegree > 0
+    dangling = ~linked
+    ranks = np.full(n, 1 / n)
+    updated = np.empty(n)
+    scaled = np.zeros(n)
+
+    for iteration in range(1, max_iterations + 1):
+        # Each page passes its rank on in equal shares along its links
+        np.divide(ranks, edges.outdegree, out=scaled, where=linked)
+        read = 0
+        for k, (lo, hi) in enumerate(edges.partitions):
+            flow = np.zeros(hi - lo)
+            for chunk, nbytes in edges.stream(k):
+                flow += np.bincount(
+                    chunk["target"] - lo, weights=scaled[chunk["source"]],
+                    minlength=hi - lo
+                )
+                read += nbytes
+            updated[lo:hi] = flow
+
+        spread = damping_factor * ranks[dangling].sum() + 1 - damping_factor
+        updated *= damping_factor
+        updated += spread / n
+        change = np.linalg.norm(updated - ranks, ord=norm)
+        ranks, updated = updated, ranks
+        if history is not None:
+            history.append(float(change))
+        if traffic is not None:
+            traffic.append(read)
+        if change < tolerance:
+            break
+    return ranks / ranks.sum(), iteration
+
+
+def pagerank(directory, damping_factor, tolerance=matrix.TOLERANCE, norm=1,
+             workdir=None, size=PARTITION):
+    """
+    Return PageRank values for each page in `directory`, computed out of
+    core, as a dictionary like `iterate_pagerank` returns, and the number
+    of iterations it took. The work directory is removed afterwards
+    unless `workdir` was given.
+    """
+    edges = partition(directory, workdir, size=size)
+    try:
+        ranks, iterations = power_iteration(edges, damping_factor, tolerance, norm)
+        return dict(zip(edges.names(), ranks.tolist())), iterations
+    finally:
+        if workdir is None:
+            edges.remove()
+
+
+if __name__ == "__main__":
+    main()
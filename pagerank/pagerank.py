@@ -2,24 +2,74 @@ import os
 import random
 import re
 import sys
+import time
+
+import crawler
+import matrix
+import sampling
+import snapshot
 
 DAMPING = 0.85
 SAMPLES = 10000
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
-    print(f"PageRank Results from Sampling (n = {SAMPLES})")
+    args = sys.argv[1:]
+    flags = {arg for arg in args if arg.startswith("--")}
+    args = [arg for arg in args if arg not in flags]
+    if len(args) != 1 or flags - {"--snapshot", "--stats"}:
+        sys.exit("Usage: python pagerank.py [--snapshot] [--stats] corpus")
+    stats = "--stats" in flags
+
+    start = time.perf_counter()
+    if "--snapshot" in flags:
+        corpus, parsed = snapshot.crawl(args[0])
+        print(f"Parsed {parsed} of {len(corpus)} pages; the rest came from the snapshot")
+    else:
+        corpus = crawler.crawl(args[0])
+    timings = {"crawl": time.perf_counter() - start}
+
+    start = time.perf_counter()
+    if stats:
+        ranks, errors = sampling.sample_with_error(corpus, DAMPING, SAMPLES)
+    else:
+        ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+    timings["sample"] = time.perf_counter() - start
+    rate = SAMPLES / timings["sample"]
+    print(f"PageRank Results from Sampling (n = {SAMPLES}, {rate:,.0f} samples/s)")
     for page in sorted(ranks):
-        print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
-    print(f"PageRank Results from Iteration")
+        if stats:
+            print(f"  {page}: {ranks[page]:.4f} ± {errors[page]:.4f}")
+        else:
+            print(f"  {page}: {ranks[page]:.4f}")
+
+    start = time.perf_counter()
+    if "--snapshot" in flags:
+        pages, sources, targets = snapshot.link_arrays(args[0], corpus)
+    else:
+        pages, index = matrix.index_pages(corpus)
+        sources, targets = matrix.link_arrays(corpus, pages, index)
+    transitions, dangling = matrix.transition_matrix(len(pages), sources, targets)
+    timings["build"] = time.perf_counter() - start
+    start = time.perf_counter()
+    residuals = []
+    values, iterations = matrix.power_iteration(
+        transitions, dangling, DAMPING, history=residuals
+    )
+    timings["iterate"] = time.perf_counter() - start
+    ranks = dict(zip(pages, values.tolist()))
+    print(f"PageRank Results from Iteration ({iterations} iterations)")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
 
+    if stats:
+        print("Residual after each iteration:")
+        for i, residual in enumerate(residuals, 1):
+            print(f"  {i}: {residual:.3e}")
+        print("Wall time: " + ", ".join(
+            f"{phase} {seconds * 1000:.1f} ms" for phase, seconds in timings.items()
+        ))
+
 
 def crawl(directory):
     """
@@ -74,7 +124,7 @@ def transition_model(corpus, page, damping_factor):
     #raise NotImplementedError
 
 
-def sample_pagerank(corpus, damping_factor, n):
+def sample_pagerank(corpus, damping_factor, n, seed=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
@@ -83,33 +133,7 @@ def sample_pagerank(corpus, damping_factor, n):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    import random
-    import numpy as np
-    first = random.choice(list(corpus))
-    prob = transition_model(corpus,first, damping_factor)
-    summ = {k: 0 for k in set(corpus)}
-    summ[first] += 1
-    
-    if n == 1:
-        return prob
-    
-    for i in range(n-1):
-        """
-        total = 0
-        rand = random.random()
-        nex = ''
-        for key,value in prob.items():
-            total += value
-            if rand <= total:
-                nex = key
-                break """
-        nex = np.random.choice(list(prob.keys()), 1, replace = True, p = list(prob.values()))[0]
-        temp = transition_model(corpus, nex, damping_factor)
-        summ[nex] += 1
-        prob = temp
-    summ = {k: summ.get(k,0)/n for k in set(summ)}
-    return summ
-    #raise NotImplementedError
+    return sampling.sample_pagerank(corpus, damping_factor, n, seed)
 
 
 def iterate_pagerank(corpus, damping_factor):
@@ -121,30 +145,8 @@ def iterate_pagerank(corpus, damping_factor):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    import copy
-    dic = {k: 1/len(corpus) for k in set(corpus)}
-    diff = copy.deepcopy(dic)
-    flag = 1
-    
-    while flag == 1:
-        for key in dic:
-            summ = (1-damping_factor)/len(corpus)
-            for i in corpus:
-                if key in corpus[i]:
-                    summ = summ + damping_factor*(dic[i]/len(corpus[i]))
-                else:
-                    continue
-            diff[key] = abs(dic[key] - summ)
-            dic[key] = summ
-            
-        for i in diff:
-            if diff[i] >= 0.001:
-                flag = 1
-                break
-            else:
-                flag = 0
-               
-    return dic
+    ranks, _ = matrix.pagerank(corpus, damping_factor)
+    return ranks
 
 #raise NotImplementedError
 
@@ -0,0 +1,109 @@
+import sys
+import time
+
+import numpy as np
+
+import crawler
+import matrix
+import snapshot
+
+# Teleport vectors iterated together in one block by default
+BLOCK = 16
+
+# Pages each random topic teleports to in the throughput report
+TOPIC_PAGES = 10
+
+DAMPING = 0.85
+
+
+def main():
+    args = sys.argv[1:]
+    flags = {arg for arg in args if arg.startswith("--")}
+    args = [arg for arg in args if arg not in flags]
+    if not 1 <= len(args) <= 2 or flags - {"--snapshot"}:
+        sys.exit("Usage: python personalized.py [--snapshot] corpus [count]")
+    if "--snapshot" in flags:
+        corpus, _ = snapshot.crawl(args[0])
+    else:
+        corpus = crawler.crawl(args[0])
+    count = int(args[1]) if len(args) == 2 else 64
+
+    # Random topics, each teleporting to a handful of pages
+    if "--snapshot" in flags:
+        pages, sources, targets = snapshot.link_arrays(args[0], corpus)
+        index = {page: i for i, page in enumerate(pages)}
+    else:
+        pages, index = matrix.index_pages(corpus)
+        sources, targets = matrix.link_arrays(corpus, pages, index)
+    rng = np.random.default_rng(0)
+    topics = [
+        {pages[i]: 1 for i in rng.choice(len(pages), min(TOPIC_PAGES, len(pages)), replace=False)}
+        for _ in range(count)
+    ]
+    transitions, dangling = matrix.transition_matrix(len(pages), sources, targets)
+    teleports = teleport_matrix(index, topics)
+
+    print(f"{count} personalized rank vectors over {len(pages)} pages")
+    block = 1
+    while True:
+        start = time.perf_counter()
+        iterations = 0
+        for i in range(0, count, block):
+            _, n = matrix.block_power_iteration(
+                transitions, dangling, DAMPING, teleports[:, i:i + block]
+            )
+            iterations = max(iterations, n)
+        seconds = time.perf_counter() - start
+        print(f"  block {block:4}: {seconds:.2f} s, {count / seconds:.1f} vectors/s, "
+              f"up to {iterations} iterations")
+        if block >= count:
+            break
+        block = min(block * 2, count)
+
+
+def teleport_matrix(index, personalizations):
+    """
+    Return an n by k array whose columns are the teleport distributions
+    given by `personalizations`, a list of dictionaries mapping pages in
+    `index` to non-negative weights. Unlisted pages get no weight.
+    """
+    teleports = np.zeros((len(index), len(personalizations)))
+    for column, weights in enumerate(personalizations):
+        for page, weight in weights.items():
+            teleports[index[page], column] = weight
+    if (teleports.sum(axis=0) <= 0).any():
+        raise ValueError("each personalization needs a positive weight")
+    return teleports
+
+
+def personalized_pagerank(corpus, damping_factor, personalizations,
+                          block=BLOCK, tolerance=matrix.TOLERANCE, norm=1):
+    """
+    Return a list of PageRank dictionaries, one for each of
+    `personalizations`, where a surfer teleports to the pages of a
+    personalization in proportion to their weights instead of uniformly.
+    Also return the most iterations any block took.
+
+    Personalizations are iterated `block` at a time.
+    """
+    pages, index = matrix.index_pages(corpus)
+    transitions, dangling = matrix.transition_matrix(
+        len(pages), *matrix.link_arrays(corpus, pages, index)
+    )
+    teleports = teleport_matrix(index, personalizations)
+
+    results = []
+    iterations = 0
+    for i in range(0, len(personalizations), block):
+        ranks, n = matrix.block_power_iteration(
+            transitions, dangling, damping_factor, teleports[:, i:i + block],
+            tolerance, norm
+        )
+        iterations = max(iterations, n)
+        for column in ranks.T:
+            results.append(dict(zip(pages, column.tolist())))
+    return results, iterations
+
+
+if __name__ == "__main__":
+    main()
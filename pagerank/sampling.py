@@ -0,0 +1,107 @@
+import numpy as np
+
+import matrix
+
+# Number of random surfers walking the corpus side by side
+SURFERS = 1000
+
+# Fewest pages each surfer visits. Surfers start at uniformly random
+# pages, and walks much shorter than this would lean towards uniform.
+STEPS = 1000
+
+# Number of visits buffered before they are added to the page counts
+FLUSH = 1 << 20
+
+# Independent walks whose estimates are compared to gauge sampling error
+BATCHES = 20
+
+
+def link_table(corpus):
+    """
+    Return a sorted list of the pages in `corpus`, and (offsets, targets)
+    arrays where the links of page i are `targets[offsets[i]:offsets[i + 1]]`.
+    """
+    pages, index = matrix.index_pages(corpus)
+    sources, targets = matrix.link_arrays(corpus, pages, index)
+    offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=len(pages)), out=offsets[1:])
+    return pages, offsets, targets
+
+
+def walk(offsets, targets, damping_factor, n, surfers=SURFERS, seed=None):
+    """
+    Return an array counting the visits to each page made by `n` samples
+    of random surfers, each starting at a page chosen at random.
+
+    Up to `surfers` walks advance together, one vectorized step at a time,
+    until `n` pages have been visited in all, each walk visiting at least
+    STEPS pages when `n` allows. At each step a surfer follows a
+    random link of its page with probability `damping_factor`, and
+    otherwise, or if the page has no links, moves to any page at random.
+    """
+    rng = np.random.default_rng(seed)
+    pages = len(offsets) - 1
+    outdegree = np.diff(offsets)
+    counts = np.zeros(pages, dtype=np.int64)
+    surfers = max(1, min(surfers, n // STEPS))
+
+    current = rng.integers(0, pages, surfers)
+    visited = []
+    remaining = n
+    while True:
+        visited.append(current[:min(surfers, remaining)])
+        remaining -= len(visited[-1])
+        if remaining == 0 or len(visited) * surfers >= FLUSH:
+            counts += np.bincount(np.concatenate(visited), minlength=pages)
+            visited = []
+        if remaining == 0:
+            return counts
+
+        degree = outdegree[current]
+        follow = (rng.random(surfers) < damping_factor) & (degree > 0)
+        links = offsets[current] + (rng.random(surfers) * degree).astype(np.int64)
+        current = rng.integers(0, pages, surfers)
+        current[follow] = targets[links[follow]]
+
+
+def sample_pagerank(corpus, damping_factor, n, seed=None, surfers=SURFERS):
+    """
+    Return PageRank values for each page of `corpus` estimated from `n`
+    samples of batched random surfers, as a dictionary like
+    `pagerank.sample_pagerank` returns. Passing the same `seed` gives
+    the same estimate.
+    """
+    pages, offsets, targets = link_table(corpus)
+    counts = walk(offsets, targets, damping_factor, n, surfers, seed)
+    return dict(zip(pages, (counts / n).tolist()))
+
+
+def sample_with_error(corpus, damping_factor, n, batches=BATCHES, seed=None,
+                      surfers=SURFERS):
+    """
+    Return PageRank estimates for each page of `corpus` from `n` samples,
+    like `sample_pagerank`, and a dictionary of their standard errors.
+
+    The samples are split among `batches` independent walks, each with
+    its own random starting pages, and the spread of their estimates
+    gives the standard error of the overall estimate. At least two
+    samples are needed, one for each of two batches.
+    """
+    if n < 2:
+        raise ValueError("need at least two samples to estimate error")
+    pages, offsets, targets = link_table(corpus)
+    batches = max(2, min(batches, n))
+    mean = np.zeros(len(pages))
+    squares = np.zeros(len(pages))
+    seeds = np.random.SeedSequence(seed).spawn(batches)
+    for b in range(batches):
+        size = n // batches + (b < n % batches)
+        estimate = walk(offsets, targets, damping_factor, size, surfers, seeds[b]) / size
+
+        # Welford's running mean and sum of squared deviations
+        delta = estimate - mean
+        mean += delta / (b + 1)
+        squares += delta * (estimate - mean)
+
+    error = np.sqrt(squares / (batches - 1) / batches)
+    return dict(zip(pages, mean.tolist())), dict(zip(pages, error.tolist()))
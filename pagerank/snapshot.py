@@ -0,0 +1,238 @@
+import json
+import mmap
+import os
+import struct
+import sys
+
+import numpy as np
+
+import crawler
+import matrix
+
+# Snapshot file written into the corpus directory it was crawled from
+SNAPSHOT = "pagerank.snapshot"
+
+# Bump whenever the layout below changes, so stale snapshots are re-crawled
+MAGIC = b"PAGERANK"
+VERSION = 1
+
+# Layout: MAGIC, then a little-endian u32 version and u64 header length,
+# then a JSON header describing each section, then the 8-byte aligned
+# sections themselves in native byte order.
+PREAMBLE = struct.Struct("<8sIQ")
+
+
+class Snapshot():
+    """
+    Memory-mapped crawl of a corpus directory.
+
+    `names` lists the crawled pages in sorted order, followed by every
+    other link target they contain. Page i was `sizes[i]` bytes and last
+    modified at `mtimes[i]` nanoseconds when crawled, and links to the
+    names numbered `targets[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, names, pages, sizes, mtimes, offsets, targets):
+        self.names = names
+        self.pages = pages
+        self.sizes = sizes
+        self.mtimes = mtimes
+        self.offsets = offsets
+        self.targets = targets
+
+    def links(self, i):
+        """Return the set of names page i links to, in the corpus or not."""
+        return {
+            self.names[target]
+            for target in self.targets[self.offsets[i]:self.offsets[i + 1]].tolist()
+        }
+
+    def entries(self):
+        """
+        Return a dictionary mapping each crawled page to its
+        (size, mtime, links) when it was crawled.
+        """
+        return {
+            self.names[i]: (int(self.sizes[i]), int(self.mtimes[i]), self.links(i))
+            for i in range(self.pages)
+        }
+
+    def corpus(self):
+        """
+        Return the crawled pages as a dictionary like `pagerank.crawl`
+        returns, keeping only links to other crawled pages.
+        """
+        return {
+            self.names[i]: {
+                self.names[target]
+                for target in self.targets[self.offsets[i]:self.offsets[i + 1]].tolist()
+                if target < self.pages
+            }
+            for i in range(self.pages)
+        }
+
+    def arrays(self):
+        """
+        Return the sorted list of pages, and (sources, targets) arrays of
+        the links between them, ready for `matrix.transition_matrix`.
+        """
+        sources = np.repeat(np.arange(self.pages), np.diff(self.offsets))
+        inside = self.targets < self.pages
+        return self.names[:self.pages], sources[inside], self.targets[inside]
+
+
+def write(directory, entries):
+    """
+    Write a snapshot of `entries`, mapping each page to its (size, mtime,
+    links) as crawled, into `directory`. Returns the snapshot's path.
+    """
+    pages = sorted(entries)
+    outside = sorted(
+        set().union(*(links for _, _, links in entries.values())) - set(entries)
+    )
+
+    # Names are stored NUL-separated; a link containing NUL names no file
+    names = pages + [link for link in outside if "\0" not in link]
+    index = {name: i for i, name in enumerate(names)}
+    links = [
+        [index[link] for link in sorted(entries[page][2]) if link in index]
+        for page in pages
+    ]
+
+    sections = {
+        "names": np.frombuffer("\0".join(names).encode("utf-8"), dtype=np.uint8),
+        "sizes": np.array([entries[page][0] for page in pages], dtype=np.int64),
+        "mtimes": np.array([entries[page][1] for page in pages], dtype=np.int64),
+        "offsets": np.concatenate(
+            ([0], np.cumsum([len(targets) for targets in links], dtype=np.int64))
+        ),
+        "targets": np.fromiter(
+            (target for targets in links for target in targets),
+            dtype=np.int32, count=sum(len(targets) for targets in links)
+        ),
+    }
+
+    # Lay the sections out one after another, each aligned to 8 bytes
+    table = {}
+    position = 0
+    for name, data in sections.items():
+        table[name] = [data.dtype.str, position, len(data)]
+        position += align(data.nbytes)
+    header = json.dumps({
+        "byteorder": sys.byteorder,
+        "pages": len(pages),
+        "sections": table,
+    }).encode("utf-8")
+    start = align(PREAMBLE.size + len(header))
+
+    path = os.path.join(directory, SNAPSHOT)
+    partial = path + ".partial"
+    with open(partial, "wb") as f:
+        f.write(PREAMBLE.pack(MAGIC, VERSION, len(header)))
+        f.write(header)
+        for name, data in sections.items():
+            f.seek(start + table[name][1])
+            f.write(data.tobytes())
+        f.truncate(start + position)
+    os.replace(partial, path)
+    return path
+
+
+def load(directory):
+    """
+    Memory-map the snapshot in `directory`. Returns a Snapshot, or None
+    if there is no snapshot or it was written in another layout.
+    """
+    path = os.path.join(directory, SNAPSHOT)
+    try:
+        with open(path, "rb") as f:
+            magic, version, length = PREAMBLE.unpack(f.read(PREAMBLE.size))
+            if magic != MAGIC or version != VERSION:
+                return None
+            header = json.loads(f.read(length))
+            if header["byteorder"] != sys.byteorder:
+                return None
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, struct.error):
+        return None
+
+    start = align(PREAMBLE.size + length)
+    sections = {}
+    for name, (dtype, offset, count) in header["sections"].items():
+        sections[name] = np.frombuffer(
+            mapped, dtype=dtype, count=count, offset=start + offset
+        )
+
+    names = sections["names"].tobytes().decode("utf-8")
+    names = names.split("\0") if names else []
+    return Snapshot(
+        names, header["pages"], sections["sizes"], sections["mtimes"],
+        sections["offsets"], sections["targets"]
+    )
+
+
+def crawl(directory, processes=None):
+    """
+    Return the same dictionary as `pagerank.crawl`, and the number of
+    pages that had to be parsed to build it.
+
+    Pages whose size and modification time match the snapshot in
+    `directory` are taken from it; the rest are parsed by `crawler`
+    worker processes, and the snapshot is rewritten if anything changed.
+    """
+    previous = load(directory)
+    known = {} if previous is None else previous.entries()
+
+    entries = {}
+    changed = []
+    for filename in sorted(os.listdir(directory)):
+        if not filename.endswith(".html"):
+            continue
+        stat = os.stat(os.path.join(directory, filename))
+        entry = known.get(filename)
+        if entry is not None and entry[:2] == (stat.st_size, stat.st_mtime_ns):
+            entries[filename] = entry
+        else:
+            entries[filename] = (stat.st_size, stat.st_mtime_ns, set())
+            changed.append(filename)
+
+    for filename, links in crawler.extract_all(directory, changed, processes):
+        size, mtime, _ = entries[filename]
+        entries[filename] = (size, mtime, links)
+
+    if changed or len(entries) != len(known):
+        try:
+            write(directory, entries)
+        except OSError:
+
+            # A snapshot that could not be rewritten no longer matches
+            try:
+                os.remove(os.path.join(directory, SNAPSHOT))
+            except OSError:
+                pass
+
+    pages = {
+        filename: {link for link in links if link in entries}
+        for filename, (_, _, links) in entries.items()
+    }
+    return pages, len(changed)
+
+
+def link_arrays(directory, corpus):
+    """
+    Return the sorted list of pages in `corpus`, and (sources, targets)
+    arrays of the links between them, like `matrix.index_pages` and
+    `matrix.link_arrays`. After `crawl`, they are read straight from the
+    snapshot in `directory` rather than from the dictionary.
+    """
+    current = load(directory)
+    pages = sorted(corpus)
+    if current is not None and current.names[:current.pages] == pages:
+        return current.arrays()
+    index = {page: i for i, page in enumerate(pages)}
+    return (pages,) + matrix.link_arrays(corpus, pages, index)
+
+
+def align(n):
+    """Rounds `n` up to a multiple of 8."""
+    return (n + 7) & ~7
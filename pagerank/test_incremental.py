@@ -0,0 +1,47 @@
+import random
+
+import pytest
+
+import pagerank
+from incremental import IncrementalPageRank
+
+DAMPING = 0.85
+
+
+def random_corpus(pages, links, seed):
+    """Return a corpus of `pages` pages, each with up to `links` random links."""
+    rng = random.Random(seed)
+    names = [f"{i}.html" for i in range(pages)]
+    return {
+        name: set(rng.sample(names, rng.randint(0, links))) - {name}
+        for name in names
+    }
+
+
+def test_update_matches_cold_iteration():
+    corpus = random_corpus(200, 6, seed=1)
+    ranks = IncrementalPageRank(corpus, DAMPING)
+
+    added = {"3.html": {"150.html", "new.html"}, "new.html": {"0.html"}}
+    removed = {page: set(list(links)[:1]) for page, links in list(corpus.items())[:20]}
+    ranks.update(added, removed)
+
+    for page, links in removed.items():
+        corpus[page] -= links
+    corpus["3.html"] |= {"150.html", "new.html"}
+    corpus["new.html"] = {"0.html"}
+    expected = pagerank.iterate_pagerank(corpus, DAMPING)
+
+    got = ranks.ranks()
+    assert got.keys() == expected.keys()
+    for page in expected:
+        assert got[page] == pytest.approx(expected[page], abs=1e-8)
+
+
+def test_removing_unknown_pages_and_links_is_skipped():
+    corpus = random_corpus(50, 4, seed=2)
+    ranks = IncrementalPageRank(corpus, DAMPING)
+    before = ranks.ranks()
+
+    ranks.update(removed={"missing.html": {"0.html"}, "1.html": {"missing.html"}})
+    assert ranks.ranks() == pytest.approx(before)